@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+
+
+class DjangoBaseConfig(AppConfig):
+    name = 'django_base'
+
+    def ready(self):
+        from . import profiling
+        connection_created.connect(profiling.install_sql_wrapper,
+                                   dispatch_uid='django_base.profiling')
+        if settings.DB_HEALTH_CHECK_IDLE is not None:
+            from .db import health
+            request_started.connect(health.check_connections,
+                                    dispatch_uid='django_base.db.health')
+            request_finished.connect(health.mark_idle, dispatch_uid='django_base.db.health')
@@ -0,0 +1,25 @@
+"""
+ASGI config for django_base project, e.g. for
+`gunicorn -k uvicorn.workers.UvicornWorker django_base.asgi:application`.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+"""
+
+import os
+import sys
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_base.settings.production")
+# See django_base/wsgi.py
+if sys.version_info < (3, 12):
+    os.environ.setdefault("SETUPTOOLS_USE_DISTUTILS", "stdlib")
+
+# Imported once the environment is set
+# pylint: disable=wrong-import-position
+from django.conf import settings  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
+
+application = get_asgi_application()
+
+if settings.WARM_UP:
+    from django_base.warmup import warm_up
+    warm_up()
@@ -0,0 +1,12 @@
+"""
+URL configuration of the ASGI handler, see django_base.middleware.AsyncURLConfMiddleware.
+
+The async views come first, the other URLs are those of ROOT_URLCONF.
+"""
+from django.urls import path, include
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('account/', include('users.async_urls')),
+    *sync_urlpatterns,
+]
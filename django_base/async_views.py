@@ -0,0 +1,81 @@
+"""
+Class-based views served as coroutines by the ASGI handler, routed by
+ASYNC_URLCONF (see django_base.middleware.AsyncURLConfMiddleware) while
+the WSGI handler serves their plain sync counterparts, where running a
+coroutine would cost an event loop per request.
+
+Django 3.1 has no async ORM nor cache API: database and cache work runs in
+the thread shared by the sync code (sync_to_async's default), while slow
+I/O touching neither, like SMTP, runs in other threads.
+"""
+import functools
+from asgiref.sync import sync_to_async
+from django.contrib.auth.mixins import AccessMixin
+from django.views import generic
+
+
+class AsyncViewMixin:
+    """
+    as_view() returns a coroutine function, awaited by the handler, for views
+    whose dispatch() is a coroutine: Django 3.1 only does so for functions.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        functools.update_wrapper(async_view, view)
+        return async_view
+
+
+class AsyncView(AsyncViewMixin, generic.View):
+    """View whose `get()`, `post()`... handlers are coroutines."""
+    # The fallback handlers are awaited by dispatch() like the others
+    # pylint: disable=invalid-overridden-method,useless-super-delegation
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return super().http_method_not_allowed(request, *args, **kwargs)
+
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    """LoginRequiredMixin for async views, the user being loaded in the sync thread."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class DeferredMailMixin:
+    """
+    Send the email of a valid form once the form is handled: form_valid()
+    sets `mailer`.
+    """
+    mailer = None
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        if self.mailer is not None:
+            self.mailer.send()
+        return response
+
+
+class AsyncDeferredMailMixin:
+    """
+    Async counterpart of DeferredMailMixin: the dispatch() of the sync view
+    it is mixed into runs in the sync thread, then the email is sent holding
+    neither the request's transaction nor the sync thread.
+    """
+    mailer = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        response = await sync_to_async(super().dispatch)(request, *args, **kwargs)
+        if self.mailer is not None:
+            await self.mailer.asend()
+        return response
@@ -0,0 +1,26 @@
+"""
+PostgreSQL backend taking its connections from a pool, selected with
+ENGINE = 'django_base.db.backends.postgresql_pool', see django_base.db.pool.
+"""
+from django.db.backends.postgresql import base, creation
+from django_base.db.pool import PooledDatabaseWrapperMixin, close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # The idle connections of the pool would prevent dropping the database
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    # Set by get_new_connection(), from the settings or the server default
+    isolation_level: int
+
+    def init_pooled_connection(self, connection) -> None:
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+
+    def reset_pooled_connection(self, connection) -> bool:
+        return not connection.closed and super().reset_pooled_connection(connection)
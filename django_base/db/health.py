@@ -0,0 +1,27 @@
+"""
+Health checks of the persistent database connections (CONN_MAX_AGE), which
+Django 3.1 reuses without checking them: a connection closed by the server
+or a failover would fail the next request.
+"""
+import time
+from django.conf import settings
+from django.db import connections
+
+
+def check_connections(**kwargs) -> None:
+    """Close, before the request uses them, idle connections that don't answer."""
+    idle_after = settings.DB_HEALTH_CHECK_IDLE
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        idle_since = getattr(connection, 'idle_since', None)
+        if idle_since is not None and now - idle_since >= idle_after \
+                and not connection.is_usable():
+            connection.close()
+
+
+def mark_idle(**kwargs) -> None:
+    now = time.monotonic()
+    for connection in connections.all():
+        connection.idle_since = now
@@ -0,0 +1,220 @@
+"""
+Thread-safe pool of database connections, shared by the threads of a process.
+
+Database wrappers using PooledDatabaseWrapperMixin take their connection from
+the pool when they connect and give it back when Django closes them, at the
+end of each request with CONN_MAX_AGE = 0. The pool is configured by the
+POOL entry of the database settings, e.g.
+{'MIN_SIZE': 2, 'MAX_SIZE': 20, 'TIMEOUT': 10, 'CHECK_IDLE': 30, 'MAX_IDLE': 600}.
+"""
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+from django.db import OperationalError
+from django_base.profiling import count
+
+if TYPE_CHECKING:
+    from django.db.backends.base.base import BaseDatabaseWrapper
+else:
+    BaseDatabaseWrapper = object
+
+DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 10,
+    # Seconds to wait for a connection when MAX_SIZE are in use
+    'TIMEOUT': 10.0,
+    # Connections idle for this many seconds are checked before reuse
+    'CHECK_IDLE': 30.0,
+    # Connections idle for longer are closed, down to MIN_SIZE
+    'MAX_IDLE': 600.0,
+}
+
+
+class ConnectionPool:
+    def __init__(self, check: Callable[[object], bool], min_size: int = 0,
+                 max_size: int = 10, timeout: float = 10.0, check_idle: float = 30.0,
+                 max_idle: float = 600.0):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f"Invalid pool size {min_size}-{max_size}")
+        self.check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self.max_idle = max_idle
+        # Most recently used last: reused first while the others expire
+        self.idle: List[Tuple[object, float]] = []
+        self.size = 0
+        self.condition = threading.Condition()
+        self.stats: Counter = Counter()
+
+    def record(self, event: str) -> None:
+        self.stats[event] += 1
+        count(f"db_pool.{event}")
+
+    def fill(self, connect: Callable[[], object]) -> None:
+        """Open connections up to MIN_SIZE."""
+        while True:
+            with self.condition:
+                if self.size >= self.min_size:
+                    return
+                self.size += 1
+            self.put(self.open(connect))
+
+    def open(self, connect: Callable[[], object]):
+        try:
+            connection = connect()
+        except BaseException:
+            self.release()
+            raise
+        self.record('connect')
+        return connection
+
+    def release(self) -> None:
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def get(self, connect: Callable[[], object]):
+        while True:
+            connection, idle_since = self.checkout()
+            if connection is None:
+                return self.open(connect)
+            if time.monotonic() - idle_since < self.check_idle or self.check(connection):
+                self.record('reuse')
+                return connection
+            self.record('check_failed')
+            self.discard(connection)
+
+    def checkout(self):
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            while not self.idle and self.size >= self.max_size:
+                self.record('wait')
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.condition.wait(remaining):
+                    self.record('timeout')
+                    raise OperationalError(
+                        f"No database connection available within {self.timeout}s, "
+                        f"the {self.max_size} connections of the pool are in use")
+            if self.idle:
+                return self.idle.pop()
+            # Reserved before connecting, outside of the lock
+            self.size += 1
+            return None, 0.0
+
+    def put(self, connection) -> None:
+        now = time.monotonic()
+        expired = []
+        with self.condition:
+            self.idle.append((connection, now))
+            while self.size > self.min_size and now - self.idle[0][1] >= self.max_idle:
+                expired.append(self.idle.pop(0)[0])
+                self.size -= 1
+            self.condition.notify()
+        for connection_ in expired:
+            self.record('expire')
+            close_quietly(connection_)
+
+    def discard(self, connection) -> None:
+        self.record('discard')
+        close_quietly(connection)
+        self.release()
+
+    def close(self) -> None:
+        """Close the idle connections, the ones in use are closed when given back."""
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+            self.condition.notify_all()
+        for connection, _ in idle:
+            close_quietly(connection)
+
+    def status(self) -> dict:
+        with self.condition:
+            return {'size': self.size, 'idle': len(self.idle),
+                    'in_use': self.size - len(self.idle), **self.stats}
+
+
+def close_quietly(connection) -> None:
+    try:
+        connection.close()
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+
+pools: Dict[tuple, ConnectionPool] = {}
+pools_lock = threading.Lock()
+
+
+def close_pools() -> None:
+    with pools_lock:
+        for pool in pools.values():
+            pool.close()
+        pools.clear()
+
+
+class PooledDatabaseWrapperMixin(BaseDatabaseWrapper):
+    """Take the connections of a DatabaseWrapper from a ConnectionPool."""
+    pool: ConnectionPool
+
+    def get_pool(self, conn_params: dict) -> ConnectionPool:
+        key = (self.vendor, tuple(sorted((name, repr(value))
+                                         for name, value in conn_params.items())))
+        with pools_lock:
+            if key not in pools:
+                options = {**DEFAULTS, **self.settings_dict.get('POOL', {})}
+                pools[key] = ConnectionPool(
+                    self.check_pooled_connection,
+                    min_size=options['MIN_SIZE'], max_size=options['MAX_SIZE'],
+                    timeout=options['TIMEOUT'], check_idle=options['CHECK_IDLE'],
+                    max_idle=options['MAX_IDLE'],
+                )
+                created = True
+            else:
+                created = False
+            pool = pools[key]
+        if created:
+            connect = super().get_new_connection
+            pool.fill(lambda: connect(conn_params))
+        return pool
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connect = super().get_new_connection
+        connection = self.pool.get(lambda: connect(conn_params))
+        self.init_pooled_connection(connection)
+        return connection
+
+    def init_pooled_connection(self, connection) -> None:
+        """Set the state get_new_connection() gives the wrapper for a new connection."""
+
+    def check_pooled_connection(self, connection) -> bool:
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except Exception:  # pylint: disable=broad-except
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.in_atomic_block or not self.reset_pooled_connection(self.connection):
+            self.pool.discard(self.connection)
+        else:
+            self.pool.put(self.connection)
+
+    def reset_pooled_connection(self, connection) -> bool:
+        """Roll back what the connection left over, False if it can't be reused."""
+        if self.errors_occurred and not self.check_pooled_connection(connection):
+            return False
+        try:
+            connection.rollback()
+        except Exception:  # pylint: disable=broad-except
+            return False
+        return True
@@ -0,0 +1,69 @@
+"""
+Reads served by the replicas listed in DATABASE_REPLICAS, writes by the
+primary (`default`).
+
+Replicas lag behind the primary, so a client reads from the primary for
+DATABASE_STICKY_SECONDS after one of its requests wrote, e.g. the profile
+shown right after it was edited, remembered by a cookie. Requests with an
+unsafe method read from the primary too, their forms validating against
+the rows they are about to write.
+
+Reads only go to the replicas within the requests handled by
+PrimaryStickinessMiddleware: commands and workers read their own writes.
+"""
+import contextlib
+import random
+from contextvars import ContextVar
+from typing import Optional
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = 'db_primary'
+
+
+class RoutingState:
+    """Database routing of one request, shared with the threads it runs in."""
+
+    def __init__(self, primary: bool = False):
+        self.primary = primary
+        self.written = False
+
+
+current_state: ContextVar[Optional[RoutingState]] = ContextVar('db_routing_state', default=None)
+
+
+class PrimaryReplicaRouter:
+    # pylint: disable=unused-argument,no-self-use
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        state = current_state.get()
+        replicas = settings.DATABASE_REPLICAS
+        if state is None or state.primary or state.written or not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints) -> str:
+        if state := current_state.get():
+            state.written = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # The replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        # The replicas get the schema by replication
+        return db not in settings.DATABASE_REPLICAS
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Read from the primary, e.g. a row just written by another client."""
+    state = current_state.get()
+    if state is None:
+        yield
+        return
+    primary, state.primary = state.primary, True
+    try:
+        yield
+    finally:
+        state.primary = primary
@@ -0,0 +1,49 @@
+import glob
+import json
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_base.profiling import empty_stats, merge_stats, percentile
+
+
+class Command(BaseCommand):
+    help = "Print the request profiles aggregated by ProfilingMiddleware in every process"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true',
+                            help="Dump the merged statistics as JSON")
+        parser.add_argument('--reset', action='store_true',
+                            help="Delete the collected statistics")
+
+    def handle(self, *args, **options):
+        paths = glob.glob(os.path.join(settings.PROFILING_DIR, '*.json'))
+        if options['reset']:
+            for path in paths:
+                os.remove(path)
+            return
+
+        views: dict = {}
+        for path in paths:
+            with open(path, encoding='utf-8') as file:
+                for view_name, stats in json.load(file).items():
+                    merge_stats(views.setdefault(view_name, empty_stats()), stats)
+
+        if options['json']:
+            self.stdout.write(json.dumps(views, indent=2))
+            return
+        self.stdout.write(f"{'view':<30}{'requests':>10}{'p50 ms':>8}{'p95 ms':>8}"
+                          f"{'avg ms':>8}{'sql':>6}{'sql ms':>8}{'tpl ms':>8}{'cpu ms':>8}")
+        for view_name, stats in sorted(views.items()):
+            count = stats['count']
+            self.stdout.write(
+                f"{view_name:<30}{count:>10}"
+                f"{percentile(stats['histogram'], 0.5):>8}"
+                f"{percentile(stats['histogram'], 0.95):>8}"
+                f"{stats['total_time'] * 1000 / count:>8.1f}"
+                f"{stats['sql_count'] / count:>6.1f}"
+                f"{stats['sql_time'] * 1000 / count:>8.1f}"
+                f"{stats['template_time'] * 1000 / count:>8.1f}"
+                f"{stats['cpu_time'] * 1000 / count:>8.1f}"
+            )
+            for name, value in sorted(stats['counters'].items()):
+                self.stdout.write(f"    {name}: {value}")
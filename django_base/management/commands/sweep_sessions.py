@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_base.sessions import DATABASE_ENGINES, sweep_expired_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete the expired sessions from the database, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help="Sessions deleted per query")
+        parser.add_argument('--pause', type=float, default=0,
+                            help="Seconds to wait between batches")
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DATABASE_ENGINES:
+            self.stdout.write(f"{settings.SESSION_ENGINE} does not store sessions "
+                              f"in the database, nothing to sweep")
+            return
+        deleted = sweep_expired_sessions(options['batch_size'], options['pause'])
+        self.stdout.write(f"{deleted} expired sessions deleted")
@@ -0,0 +1,54 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Tuple
+import markdown
+from django.conf import settings
+from django.core.cache import caches
+from .profiling import count
+
+_rendered: Dict[str, Tuple[tuple, str]] = {}
+_lock = threading.Lock()
+
+
+def markdown_from_file(file_path: str) -> str:
+    with open(file_path, 'r', encoding='utf-8') as file:
+        text = file.read()
+        return markdown.markdown(text)
+
+
+def cached_markdown_from_file(file_path: str) -> str:
+    """
+    Render a Markdown file once per version of the file, identified by its
+    modification time and size. Renders are kept in process and, when
+    MARKDOWN_CACHE_ALIAS is set, shared through the Django cache.
+    """
+    stat = os.stat(file_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _rendered.get(file_path)
+    if cached and cached[0] == version:
+        count('markdown.hit')
+        return cached[1]
+    count('markdown.miss')
+
+    alias = getattr(settings, 'MARKDOWN_CACHE_ALIAS', None)
+    shared = caches[alias] if alias else None
+    key = cache_key(file_path, version)
+    html = shared.get(key) if shared else None
+    if html is None:
+        html = markdown_from_file(file_path)
+        if shared:
+            shared.set(key, html, None)
+    with _lock:
+        _rendered[file_path] = (version, html)
+    return html
+
+
+def cache_key(file_path: str, version: tuple) -> str:
+    path_hash = hashlib.md5(file_path.encode()).hexdigest()
+    return f"markdown:{path_hash}:{version[0]}:{version[1]}"
+
+
+def clear() -> None:
+    with _lock:
+        _rendered.clear()
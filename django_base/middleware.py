@@ -0,0 +1,280 @@
+import json
+import mimetypes
+import os
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from .db.router import STICKY_COOKIE, RoutingState, current_state
+from .profiling import RequestProfile, aggregator, current_profile
+
+# Preferred first, see django_base.storage
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class AsyncURLConfMiddleware:
+    """
+    Resolve the requests of the ASGI handler with ASYNC_URLCONF, whose views
+    are coroutines (see django_base.async_views), the WSGI ones with
+    ROOT_URLCONF. Django runs the middlewares in async mode under ASGI only.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.urlconf = settings.ASYNC_URLCONF
+        return await self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Profile a sample of the requests: SQL queries, template rendering, CPU
+    time and cache counters. Results are sent in a Server-Timing header and
+    aggregated per view for `manage.py profiling_report`.
+
+    Under ASGI the CPU time is the event loop thread's only.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            # Awaited without a thread switch by the ASGI handler
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled(request):
+            return self.get_response(request)
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        profile.total_time = time.perf_counter() - start
+        profile.cpu_time = time.thread_time() - cpu_start
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not self.sampled(request):
+            return await self.get_response(request)
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        profile.total_time = time.perf_counter() - start
+        profile.cpu_time = time.thread_time() - cpu_start
+        return self.finish(request, response, profile)
+
+    @staticmethod
+    def finish(request, response, profile: RequestProfile):
+        response['Server-Timing'] = profile.server_timing()
+        match = request.resolver_match
+        aggregator.record(match.view_name if match else 'unresolved', profile)
+        return response
+
+    def process_template_response(self, request, response):  # pylint: disable=no-self-use
+        if profile := current_profile.get():
+            start = time.perf_counter()
+
+            def rendered(_response):
+                profile.template_time += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def sampled(request) -> bool:
+        prefixes = settings.PROFILING_PATH_PREFIXES
+        if prefixes and not request.path_info.startswith(tuple(prefixes)):
+            return False
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+class StaticFilesMiddleware:
+    """
+    Serve the collected static files from STATIC_ROOT when STATIC_SERVE is
+    set, with their precompressed variants when the client accepts them.
+
+    Files named after their content hash in staticfiles.json are cached for a
+    year, the others for STATIC_MAX_AGE and revalidated with Last-Modified.
+    STATIC_ROOT is indexed once, when the process starts.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.prefix = settings.STATIC_URL
+        self.files = self.index(settings.STATIC_ROOT)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
+
+    @staticmethod
+    def index(root: str) -> dict:
+        """Headers and variants of each file, keyed by name."""
+        if not os.path.isdir(root):
+            return {}
+        paths = {}
+        for directory, _dirs, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                paths[os.path.relpath(path, root).replace(os.sep, '/')] = path
+        try:
+            with open(os.path.join(root, 'staticfiles.json'), encoding='utf-8') as manifest:
+                hashed = set(json.load(manifest).get('paths', {}).values())
+        except (OSError, ValueError):
+            hashed = set()
+        files = {}
+        for name, path in paths.items():
+            if any(name.endswith(extension) and name[:-len(extension)] in paths
+                   for _, extension in ENCODINGS):
+                # A variant, served in place of its file
+                continue
+            stat = os.stat(path)
+            content_type, _ = mimetypes.guess_type(name)
+            files[name] = {
+                'path': path,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'content_type': content_type or 'application/octet-stream',
+                'cache_control': (IMMUTABLE if name in hashed
+                                  else f'public, max-age={settings.STATIC_MAX_AGE}'),
+                'variants': [(encoding, paths[name + extension],
+                              os.path.getsize(paths[name + extension]))
+                             for encoding, extension in ENCODINGS
+                             if name + extension in paths],
+            }
+        return files
+
+    @staticmethod
+    def accepted_encodings(header: str) -> set:
+        """Codings of an Accept-Encoding header, but those refused with q=0."""
+        accepted = set()
+        for coding in header.split(','):
+            name, *params = coding.split(';')
+            quality = 1.0
+            for param in params:
+                key, _, value = param.partition('=')
+                if key.strip().lower() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0
+            if quality > 0:
+                accepted.add(name.strip().lower())
+        return accepted
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        file = self.files.get(request.path_info[len(self.prefix):])
+        if file is None:
+            return None
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                                  file['mtime'], file['size']):
+            response = HttpResponseNotModified()
+        else:
+            path, size, encoding = file['path'], file['size'], None
+            accepted = self.accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            for variant_encoding, variant_path, variant_size in file['variants']:
+                if variant_encoding in accepted:
+                    path, size, encoding = variant_path, variant_size, variant_encoding
+                    break
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=file['content_type'])
+            else:
+                # Closed by the response once streamed
+                response = FileResponse(open(path, 'rb'),  # pylint: disable=consider-using-with
+                                        content_type=file['content_type'])
+            response['Content-Length'] = size
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(file['mtime'])
+        response['Cache-Control'] = file['cache_control']
+        if file['variants']:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Route the reads of a request for django_base.db.router, and pin the
+    client to the primary database for DATABASE_STICKY_SECONDS once one of
+    its requests wrote.
+    """
+    sync_capable = True
+    async_capable = True
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.state(request)
+        token = current_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_state.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state = self.state(request)
+        token = current_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_state.reset(token)
+        return self.finish(response, state)
+
+    def state(self, request) -> RoutingState:
+        return RoutingState(primary=request.method not in self.safe_methods
+                            or STICKY_COOKIE in request.COOKIES)
+
+    @staticmethod
+    def finish(response, state: RoutingState):
+        if state.written:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=settings.DATABASE_STICKY_SECONDS,
+                                secure=settings.SESSION_COOKIE_SECURE, httponly=True,
+                                samesite='Lax')
+        return response
@@ -0,0 +1,91 @@
+import hashlib
+import re
+from urllib.parse import urlencode
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+from .profiling import count
+
+CSRF_PLACEHOLDER = '__csrf_token_placeholder__'
+CSRF_INPUT = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+class AnonymousPageCacheMixin:
+    """
+    Cache the rendered page for anonymous users, per host, path, language and
+    value of the query parameters listed in `page_cache_query`. Requests with
+    other query parameters aren't cached, so that clients can't fill the cache
+    with variants of a page.
+
+    The CSRF token is punched out of the cached content and a fresh token is
+    inserted for every request, so cached forms stay valid. Responses setting
+    other cookies or displaying messages are never cached.
+    """
+    page_cache_query: tuple = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        cache = caches[settings.PAGE_CACHE_ALIAS]
+        key = self.page_cache_key(request)
+        if cached := cache.get(key, version=settings.PAGE_CACHE_VERSION):
+            count('page_cache.hit')
+            return self.cached_response(request, cached)
+        count('page_cache.miss')
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        def store(rendered):
+            if entry := self.page_cache_entry(rendered):
+                cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT,
+                          version=settings.PAGE_CACHE_VERSION)
+
+        if getattr(response, 'is_rendered', True):
+            store(response)
+        else:
+            response.add_post_render_callback(store)
+        return response
+
+    def page_cacheable(self, request) -> bool:
+        return (
+            request.method == 'GET'
+            and settings.PAGE_CACHE_ALIAS is not None
+            and set(request.GET) <= set(self.page_cache_query)
+            and not request.user.is_authenticated
+            and not get_messages(request)
+        )
+
+    @staticmethod
+    def page_cache_key(request) -> str:
+        query = urlencode(sorted(request.GET.lists()), doseq=True)
+        location = f"{request.get_host()}{request.path}?{query}"
+        location_hash = hashlib.md5(location.encode()).hexdigest()
+        return f"page:{translation.get_language()}:{location_hash}"
+
+    @staticmethod
+    def page_cache_entry(response) -> dict:
+        # The CSRF cookie is set again on every cache hit through get_token()
+        cookies = set(response.cookies) - {settings.CSRF_COOKIE_NAME}
+        if response.status_code != 200 or cookies or response.streaming:
+            return {}
+        content, csrf_count = CSRF_INPUT.subn(
+            rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', response.content.decode(response.charset)
+        )
+        return {
+            'content': content,
+            'csrf': bool(csrf_count),
+            'headers': list(response.items()),
+        }
+
+    @staticmethod
+    def cached_response(request, entry: dict) -> HttpResponse:
+        content = entry['content']
+        if entry['csrf']:
+            content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+        response = HttpResponse(content)
+        for header, value in entry['headers']:
+            response[header] = value
+        return response
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional
+from django.conf import settings
+
+# Upper bounds, in milliseconds, of the request time histogram buckets
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+logger = logging.getLogger(__name__)
+
+current_profile: ContextVar[Optional['RequestProfile']] = ContextVar(
+    'current_profile', default=None
+)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Increment a counter of the request being profiled, if any."""
+    if profile := current_profile.get():
+        profile.counters[name] += value
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """Execute wrapper of every connection, see DjangoBaseConfig.ready."""
+    if profile := current_profile.get():
+        return profile.sql_wrapper(execute, sql, params, many, context)
+    return execute(sql, params, many, context)
+
+
+def install_sql_wrapper(**kwargs) -> None:
+    # Installed on each connection, as async views query the database from
+    # another thread than the middleware's, with the request's context.
+    # Receivers of connection_created get the connection among the kwargs.
+    connection = kwargs['connection']
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cpu_time = 0.0
+        self.total_time = 0.0
+        self.counters: Counter = Counter()
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - start
+
+    def server_timing(self) -> str:
+        metrics = [
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cpu;dur={self.cpu_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ]
+        if self.counters:
+            counters = ' '.join(f"{name}={value}"
+                                for name, value in sorted(self.counters.items()))
+            metrics.append(f'cache;desc="{counters}"')
+        return ', '.join(metrics)
+
+
+class Aggregator:
+    """Request profiles aggregated per view, periodically written to a file."""
+
+    def __init__(self):
+        self.views: Dict[str, dict] = {}
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, view_name: str, profile: RequestProfile) -> None:
+        now = time.monotonic()
+        with self._lock:
+            stats = self.views.setdefault(view_name, empty_stats())
+            add_profile(stats, profile)
+            # A single thread flushes once the interval elapsed
+            due = now - self.last_flush > settings.PROFILING_FLUSH_INTERVAL
+            if due:
+                self.last_flush = now
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the stats to the profiling directory, logging on failure.
+
+        Runs on the request path: an unwritable directory must not fail the
+        request, the stats being written again at the next flush.
+        """
+        with self._lock:
+            self.last_flush = time.monotonic()
+            data = json.dumps(self.views)
+        path = os.path.join(settings.PROFILING_DIR,
+                            f"{socket.gethostname()}-{os.getpid()}.json")
+        try:
+            os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+            # Unique temporary file, as threads may flush concurrently
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=settings.PROFILING_DIR)
+            try:
+                with os.fdopen(fd, 'w') as file:
+                    file.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            logger.exception("Could not write the profiling stats to %s", path)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.views.clear()
+
+
+def empty_stats() -> dict:
+    return {'count': 0, 'histogram': [0] * len(BUCKETS), 'sql_count': 0,
+            'sql_time': 0.0, 'template_time': 0.0, 'cpu_time': 0.0,
+            'total_time': 0.0, 'counters': {}}
+
+
+def add_profile(stats: dict, profile: RequestProfile) -> None:
+    stats['count'] += 1
+    total_ms = profile.total_time * 1000
+    bucket = next(index for index, bound in enumerate(BUCKETS) if total_ms <= bound)
+    stats['histogram'][bucket] += 1
+    stats['sql_count'] += profile.sql_count
+    for name in ('sql_time', 'template_time', 'cpu_time', 'total_time'):
+        stats[name] += getattr(profile, name)
+    for name, value in profile.counters.items():
+        stats['counters'][name] = stats['counters'].get(name, 0) + value
+
+
+def merge_stats(stats: dict, other: dict) -> None:
+    for name in ('count', 'sql_count', 'sql_time', 'template_time',
+                 'cpu_time', 'total_time'):
+        stats[name] += other[name]
+    stats['histogram'] = [a + b for a, b in zip(stats['histogram'], other['histogram'])]
+    for name, value in other['counters'].items():
+        stats['counters'][name] = stats['counters'].get(name, 0) + value
+
+
+def percentile(histogram: list, fraction: float) -> float:
+    """Upper bound, in milliseconds, of the bucket holding the percentile."""
+    target = sum(histogram) * fraction
+    seen = 0
+    for bound, value in zip(BUCKETS, histogram):
+        seen += value
+        if seen >= target:
+            return bound
+    return BUCKETS[-1]
+
+
+aggregator = Aggregator()
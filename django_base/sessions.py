@@ -0,0 +1,31 @@
+import time
+from typing import Optional
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.utils import timezone
+
+# Engines keeping the sessions in the django_session table
+DATABASE_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def sweep_expired_sessions(batch_size: Optional[int] = None, pause: float = 0) -> int:
+    """
+    Delete the expired sessions in short transactions, unlike clearsessions
+    whose single DELETE locks the table for as long as it runs.
+    """
+    batch_size = batch_size or settings.SESSION_SWEEP_BATCH_SIZE
+    now = timezone.now()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            keys = list(Session.objects.filter(expire_date__lt=now)
+                        .values_list('session_key', flat=True)[:batch_size])
+            if not keys:
+                return deleted
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+        if pause:
+            time.sleep(pause)
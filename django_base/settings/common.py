@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/1.11/ref/settings/
 """
 
+import json
 import os
-from typing import List
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -24,7 +26,8 @@ BASE_URL = "http://localhost:8000/"
 SECRET_KEY = 'x6*2qwdop=e)onh&()l!q+029#!18cm)$uwi)w^tyl*s5g-nxn'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Turned on by the development settings
+DEBUG = False
 
 ALLOWED_HOSTS: List[str] = []
 
@@ -35,11 +38,63 @@ AUTH_USER_MODEL = 'users.EmailUser'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 LOGIN_URL = '/account/login'
+# Lifetime of the signed links sent to validate an account or a new email
+VALIDATION_TOKEN_TTL = timedelta(days=7)
+# Verified and rejected tokens kept in process, longer tokens are refused
+TOKEN_CACHE_SIZE = 4096
+TOKEN_MAX_LENGTH = 1024
 
 AUTHENTICATION_BACKENDS = (
     'users.backends.CustomBackend',
     )
 
+# Users resolved on each request are kept in a per-process LRU. The shared
+# cache stores per-user versions so saves invalidate every process; set the
+# alias to None for a local only cache, bounded by USER_CACHE_TIMEOUT.
+USER_CACHE_ALIAS = 'default'
+USER_CACHE_SIZE = 1024
+USER_CACHE_TIMEOUT = 300
+
+# Rendered Markdown files are kept in process, this cache alias optionally
+# shares them between processes.
+MARKDOWN_CACHE_ALIAS = None
+
+# Pages using AnonymousPageCacheMixin are cached for anonymous users per path
+# and language. A new DJANGO_RELEASE on deploy invalidates every cached page.
+PAGE_CACHE_ALIAS = 'default'
+PAGE_CACHE_TIMEOUT = 600
+PAGE_CACHE_VERSION = os.environ.get('DJANGO_RELEASE', '1')
+
+# Login attempts allowed per client IP and per identifier (username or email),
+# as (attempts, seconds), rejected before the user lookup and password hash.
+# Counted in this cache alias, or in each process memory when None.
+LOGIN_THROTTLE_ALIAS = 'default'
+LOGIN_THROTTLE_RATES = {
+    'ip': (30, 60),
+    'identifier': (10, 600),
+}
+# Proxies in front of the app, e.g. a load balancer, each appending the address
+# it got the request from to X-Forwarded-For. With 0, clients are identified by
+# REMOTE_ADDR.
+TRUSTED_PROXY_COUNT = int(os.environ.get('DJANGO_TRUSTED_PROXY_COUNT', 0))
+
+# Session engine: cached_db (read from the cache, written through to the
+# database), cache (no database, sessions are lost with the cache) or
+# signed_cookies (stateless, sessions can't be revoked before they expire).
+SESSION_BACKEND = os.environ.get('DJANGO_SESSION_BACKEND', 'cached_db')
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_BACKEND}'
+SESSION_CACHE_ALIAS = 'default'
+# Flash messages are kept in a signed cookie (cookie), in the session
+# (session) or in a cookie falling back to the session when too large (fallback).
+MESSAGE_BACKEND = os.environ.get('DJANGO_MESSAGE_BACKEND', 'cookie')
+MESSAGE_STORAGE = {
+    'cookie': 'django.contrib.messages.storage.cookie.CookieStorage',
+    'session': 'django.contrib.messages.storage.session.SessionStorage',
+    'fallback': 'django.contrib.messages.storage.fallback.FallbackStorage',
+}[MESSAGE_BACKEND]
+# Expired sessions deleted per query by `manage.py sweep_sessions`
+SESSION_SWEEP_BATCH_SIZE = 1000
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -57,7 +112,11 @@ INSTALLED_APPS = [
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
+    'django_base.middleware.ProfilingMiddleware',
+    'django_base.middleware.AsyncURLConfMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django_base.middleware.StaticFilesMiddleware',
+    'django_base.middleware.PrimaryStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -66,19 +125,25 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Share of the requests profiled by ProfilingMiddleware, restricted to
+# paths starting with one of the prefixes (all paths when empty).
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_PATH_PREFIXES = ('/account/',)
+# Each process writes its aggregated profiles there for `profiling_report`
+PROFILING_DIR = os.path.join(BASE_DIR, 'tmp', 'profiling')
+PROFILING_FLUSH_INTERVAL = 60
+
 ROOT_URLCONF = 'django_base.urls'
+# Used under ASGI: the same URLs, served by async views where they wait on slow I/O
+ASYNC_URLCONF = 'django_base.async_urls'
 
 
-TEMPLATES = [
+TEMPLATES: List[Dict[str, Any]] = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": [
-            os.path.join(BASE_DIR, "templates"),
-            os.path.join(BASE_DIR, "templates", "django_base"),
-            os.path.join(BASE_DIR, "django_base", "templates"),
-            os.path.join(BASE_DIR, "django_base", "templates", "django_base"),
-            os.path.join(BASE_DIR, "users", "templates", "users"),
-        ],
+        # Every template is in an app's templates directory: each extra
+        # directory is one more path to stat on every template lookup.
+        "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
@@ -96,16 +161,43 @@ TEMPLATES = [
 WSGI_APPLICATION = 'django_base.wsgi.application'
 
 
-DATABASES = {
+# Reuse the connections through a pool (django_base.db.pool) instead of
+# connecting on every request, the default in production
+DB_POOL = os.environ.get('DJANGO_DB_POOL', '0') == '1'
+
+DATABASES: Dict[str, Dict[str, Any]] = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'django',
-        'USER': 'postgres',
-        'PASSWORD': 'django123',
-        'HOST': 'localhost',
-        'PORT': 5434,
+        'ENGINE': ('django_base.db.backends.postgresql_pool' if DB_POOL
+                   else 'django.db.backends.postgresql'),
+        'NAME': os.environ.get('DJANGO_DB_NAME', 'django'),
+        'USER': os.environ.get('DJANGO_DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', 'django123'),
+        'HOST': os.environ.get('DJANGO_DB_HOST', 'localhost'),
+        'PORT': int(os.environ.get('DJANGO_DB_PORT', 5434)),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DJANGO_DB_POOL_MIN_SIZE', 0)),
+            'MAX_SIZE': int(os.environ.get('DJANGO_DB_POOL_MAX_SIZE', 10)),
+        },
     }
 }
+# Read replicas of the primary database, by host (comma separated)
+DATABASE_REPLICAS: List[str] = []
+for number, host in enumerate(os.environ.get('DJANGO_DB_REPLICA_HOSTS', '').split(','), 1):
+    if host:
+        DATABASES[f'replica{number}'] = {**DATABASES['default'], 'HOST': host,
+                                         'TEST': {'MIRROR': 'default'}}
+        DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['django_base.db.router.PrimaryReplicaRouter']
+# Clients read from the primary for this long after writing, the replicas lag
+DATABASE_STICKY_SECONDS = 10
+
+# Persistent connections (CONN_MAX_AGE) idle for this many seconds are checked
+# before a request reuses them, None disables the checks.
+DB_HEALTH_CHECK_IDLE: Optional[int] = None
+
+# Compile the templates and load the URLs and translations when a WSGI worker
+# starts instead of on its first request.
+WARM_UP = False
 
 
 # Password validation
@@ -126,6 +218,23 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Hasher of the new passwords: pbkdf2_sha256, scrypt or argon2 (requires argon2-cffi).
+# Other hashes are upgraded on login, PBKDF2 ones also by `manage.py rehash_passwords`.
+PASSWORD_HASHER = os.environ.get('DJANGO_PASSWORD_HASHER', 'pbkdf2_sha256')
+# Cost parameters by algorithm, e.g. {"pbkdf2_sha256": {"iterations": 400000}},
+# {"scrypt": {"work_factor": 32768}} or {"argon2": {"time_cost": 4}}
+PASSWORD_HASHER_COST = json.loads(os.environ.get('DJANGO_PASSWORD_HASHER_COST', '{}'))
+password_hashers = {
+    'pbkdf2_sha256': 'users.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'users.hashers.ScryptPasswordHasher',
+    'argon2': 'users.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [
+    password_hashers.pop(PASSWORD_HASHER),
+    *password_hashers.values(),
+    'users.hashers.WrappedPBKDF2PasswordHasher',
+]
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 LANGUAGES = (
@@ -156,7 +265,26 @@ STATIC_URL = "/static/"
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
 ]
+# Filled by `manage.py collectstatic`
+STATIC_ROOT = os.environ.get('DJANGO_STATIC_ROOT', os.path.join(BASE_DIR, "staticfiles"))
+# Serve STATIC_ROOT with StaticFilesMiddleware, the files not named after their
+# content hash being cached for STATIC_MAX_AGE seconds.
+STATIC_SERVE = False
+STATIC_MAX_AGE = 3600
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'tmp', 'emails')
 DEFAULT_FROM_EMAIL = 'test@test.fr'
+
+# Emails are stored in an outbox table and sent by `manage.py send_queued_emails`
+EMAIL_QUEUE = True
+EMAIL_QUEUE_BATCH_SIZE = 100
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+EMAIL_QUEUE_BACKOFF = 60
+# Seconds a batch is reserved for the worker sending it
+EMAIL_QUEUE_LEASE = 300
+# Messages handed to the mail connection at once by UserMailer.send_bulk
+EMAIL_BULK_CHUNK_SIZE = 500
+
+# Rows validated, hashed and inserted at once by `manage.py import_users`
+USER_BULK_BATCH_SIZE = 5000
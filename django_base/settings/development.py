@@ -1 +1,8 @@
-from .common import *
\ No newline at end of file
+"""
+Development settings, used by `manage.py` but for the tests: the common
+settings, with the debug pages and the email templates rendered on every
+send (see users.mailer).
+"""
+from .common import *
+
+DEBUG = True
@@ -0,0 +1,67 @@
+"""
+Production settings, read from the environment:
+
+- DJANGO_SECRET_KEY and DJANGO_ALLOWED_HOSTS (comma separated), required;
+- DJANGO_CACHE_BACKEND, required, and DJANGO_CACHE_LOCATION: a cache shared
+  by the workers, which invalidate the users and pages they cache, count the
+  login attempts and store the sessions in it;
+- DJANGO_DB_NAME, DJANGO_DB_USER, DJANGO_DB_PASSWORD, DJANGO_DB_HOST,
+  DJANGO_DB_PORT, DJANGO_DB_POOL (1 by default, 0 connects without the
+  pool), DJANGO_DB_POOL_MIN_SIZE, DJANGO_DB_POOL_MAX_SIZE and
+  DJANGO_CONN_MAX_AGE;
+- DJANGO_DB_REPLICA_HOSTS, the hosts of the read replicas (comma separated);
+- DJANGO_EMAIL_HOST, DJANGO_EMAIL_PORT, DJANGO_EMAIL_HOST_USER and
+  DJANGO_EMAIL_HOST_PASSWORD;
+- DJANGO_STATIC_ROOT, where `manage.py collectstatic` writes the static files;
+- DJANGO_TRUSTED_PROXY_COUNT, the proxies appending to X-Forwarded-For in
+  front of the app, identifying the clients whose logins are throttled.
+"""
+from copy import deepcopy
+from .common import *
+
+DEBUG = False
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+ALLOWED_HOSTS = os.environ['DJANGO_ALLOWED_HOSTS'].split(',')
+BASE_URL = os.environ.get('DJANGO_BASE_URL', BASE_URL)
+
+DB_POOL = os.environ.get('DJANGO_DB_POOL', '1') == '1'
+DATABASES = deepcopy(DATABASES)
+for database in DATABASES.values():
+    if DB_POOL:
+        database['ENGINE'] = 'django_base.db.backends.postgresql_pool'
+    # Pooled connections go back to the pool at the end of each request
+    database['CONN_MAX_AGE'] = int(os.environ.get('DJANGO_CONN_MAX_AGE', 0 if DB_POOL else 600))
+DB_HEALTH_CHECK_IDLE = 30
+
+CACHES = {
+    'default': {
+        # A per process cache would let every worker serve stale users and pages
+        'BACKEND': os.environ['DJANGO_CACHE_BACKEND'],
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+
+# Templates are compiled once per process
+TEMPLATES = deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+WARM_UP = True
+
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = os.environ.get('DJANGO_EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('DJANGO_EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('DJANGO_EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('DJANGO_EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = EMAIL_PORT == 587
+
+# Hashed and precompressed by `manage.py collectstatic`, see django_base.storage
+STATICFILES_STORAGE = 'django_base.storage.CompressedManifestStaticFilesStorage'
+STATIC_SERVE = True
+
+SESSION_COOKIE_SECURE = True
+CSRF_COOKIE_SECURE = True
+PROFILING_DIR = os.environ.get('DJANGO_PROFILING_DIR', PROFILING_DIR)
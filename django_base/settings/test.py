@@ -1,3 +1,13 @@
 from .common import *
 
-LANGUAGE_CODE = "en"
\ No newline at end of file
+LANGUAGE_CODE = "en"
+
+PROFILING_SAMPLE_RATE = 0
+
+# Cached data would outlive the transaction rolled back after each test,
+# tests exercising a cache opt in with override_settings.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
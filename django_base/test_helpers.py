@@ -1,5 +1,26 @@
+import os
+import statistics
 from django.http.response import HttpResponse
 
+# Benchmarks are skipped unless the BENCHMARK environment variable is set
+BENCHMARK = os.environ.get('BENCHMARK')
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+    }
+}
+
+
+def report(name: str, timings: list) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"\n{name}: {len(timings)} runs, "
+          f"mean {statistics.mean(timings) * 1000:.3f}ms, "
+          f"median {statistics.median(timings) * 1000:.3f}ms, "
+          f"p95 {p95 * 1000:.3f}ms")
+
 
 class TestHelpers:
     @staticmethod
@@ -0,0 +1,83 @@
+import re
+from django.contrib.messages import constants
+from django.core.cache import caches
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+from django_base.test_helpers import LOCMEM_CACHES, TestHelpers
+from users.tests.test_data import create_user_jake
+
+CSRF_VALUE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]*)"')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnonymousPageCacheTest(TestCase, TestHelpers):
+    def setUp(self):
+        caches['default'].clear()
+
+    def assert_served_from_cache(self, url: str):
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([], response.templates)
+        return response
+
+    def test_cached_pages(self):
+        for url_name in ('home', 'login', 'register', 'reset_password'):
+            first = self.client.get(reverse(url_name))
+            second = self.assert_served_from_cache(reverse(url_name))
+            self.assertEqual(CSRF_VALUE.sub('', first.content.decode()),
+                             CSRF_VALUE.sub('', second.content.decode()))
+            self.assertEqual(first['Content-Type'], second['Content-Type'])
+
+    def test_csrf_token_per_request(self):
+        client = Client(enforce_csrf_checks=True)
+        client.get(reverse('login'))
+        response = client.get(reverse('login'))
+        token = CSRF_VALUE.search(response.content.decode()).group(1)
+        self.assertNotIn('placeholder', token)
+        self.assertIn('csrftoken', response.cookies)
+        create_user_jake()
+        response = client.post(reverse('login'), {
+            'username': 'baracuda', 'password': 'rosa1234',
+            'csrfmiddlewaretoken': token,
+        })
+        self.assertEqual(302, response.status_code)
+
+    def test_key_per_query_string(self):
+        self.client.get(reverse('login'))
+        response = self.client.get(reverse('login') + '?next=/account/')
+        self.assertEqual('users/login.html', response.template_name[0])
+        self.assert_served_from_cache(reverse('login') + '?next=/account/')
+
+    def test_unknown_query_not_cached(self):
+        for url in (reverse('home') + '?page=2', reverse('login') + '?next=/account/&x=1'):
+            self.client.get(url)
+            response = self.client.get(url)
+            self.assertNotEqual([], response.templates)
+
+    def test_key_per_language(self):
+        self.client.get(reverse('home'))
+        with override_settings(LANGUAGE_CODE='fr'):
+            response = self.client.get(reverse('home'))
+        self.assert_content(response, 'Accueil')
+
+    def test_new_release(self):
+        self.client.get(reverse('home'))
+        with override_settings(PAGE_CACHE_VERSION='2'):
+            response = self.client.get(reverse('home'))
+        self.assertEqual('home.html', response.template_name[0])
+
+    def test_authenticated_not_cached(self):
+        self.client.get(reverse('home'))
+        self.client.force_login(create_user_jake())
+        response = self.client.get(reverse('home'))
+        self.assertEqual('home.html', response.template_name[0])
+        self.assert_content(response, 'logout')
+
+    def test_pending_messages_not_cached(self):
+        self.client.get(reverse('login'))
+        self.client.post(reverse('reset_password'), {'email': 'jake.peralta@b99.com'})
+        response = self.client.get(reverse('login'))
+        self.assertEqual('users/login.html', response.template_name[0])
+        self.assert_message(response, 'Please check your emails. '
+                                      'We will send you a link to reset your password')
+        self.assertEqual(constants.INFO, list(response.context['messages'])[0].level)
@@ -0,0 +1,184 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3 import base as sqlite3_base
+from django.test import SimpleTestCase
+from django_base.db.pool import PooledDatabaseWrapperMixin, close_pools, pools
+from django_base.test_helpers import BENCHMARK, report
+
+
+class PooledSQLiteWrapper(PooledDatabaseWrapperMixin, sqlite3_base.DatabaseWrapper):
+    pass
+
+
+def settings_dict(engine: str, name: str, **pool) -> dict:
+    return {
+        'ENGINE': engine, 'NAME': name, 'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+        'OPTIONS': {}, 'TIME_ZONE': None, 'CONN_MAX_AGE': 0, 'AUTOCOMMIT': True,
+        'ATOMIC_REQUESTS': False, 'TEST': {}, 'POOL': pool,
+    }
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """Run against a SQLite file, the in-memory test database being per connection."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.name = os.path.join(self.directory, 'pool.sqlite3')
+
+    def tearDown(self):
+        close_pools()
+        shutil.rmtree(self.directory)
+
+    def wrapper(self, **pool) -> PooledSQLiteWrapper:
+        return PooledSQLiteWrapper(settings_dict('django.db.backends.sqlite3', self.name, **pool))
+
+    def query(self, wrapper, sql: str = 'SELECT 1', params=()):
+        with wrapper.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def test_reuse(self):
+        first = self.wrapper()
+        self.query(first)
+        raw = first.connection
+        first.close()
+        second = self.wrapper()
+        self.assertEqual([(1,)], self.query(second))
+        self.assertIs(raw, second.connection)
+        self.assertEqual({'size': 1, 'idle': 0, 'in_use': 1, 'connect': 1, 'reuse': 1},
+                         second.pool.status())
+
+    def test_rollback_on_release(self):
+        wrapper = self.wrapper()
+        self.query(wrapper, 'CREATE TABLE item (id INTEGER)')
+        wrapper.set_autocommit(False)
+        self.query(wrapper, 'INSERT INTO item VALUES (1)')
+        wrapper.close()
+        self.assertEqual([], self.query(self.wrapper(), 'SELECT * FROM item'))
+
+    def test_check_failed(self):
+        wrapper = self.wrapper(CHECK_IDLE=0)
+        self.query(wrapper)
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper = self.wrapper()
+        pool, = pools.values()
+        with mock.patch.object(pool, 'check', return_value=False):
+            self.query(wrapper)
+        self.assertIsNot(raw, wrapper.connection)
+        status = wrapper.pool.status()
+        self.assertEqual((1, 1, 1, 2), (status['size'], status['check_failed'],
+                                        status['discard'], status['connect']))
+
+    def test_unusable_connection_discarded(self):
+        wrapper = self.wrapper()
+        self.query(wrapper)
+        wrapper.errors_occurred = True
+        wrapper.connection.close()
+        wrapper.close()
+        self.assertEqual({'size': 0, 'idle': 0, 'in_use': 0, 'connect': 1, 'discard': 1},
+                         wrapper.pool.status())
+
+    def test_timeout(self):
+        first = self.wrapper(MAX_SIZE=1, TIMEOUT=0.01)
+        self.query(first)
+        with self.assertRaises(OperationalError):
+            self.query(self.wrapper())
+        first.close()
+        self.assertEqual([(1,)], self.query(self.wrapper()))
+        self.assertEqual(1, first.pool.stats['timeout'])
+
+    def test_min_size(self):
+        wrapper = self.wrapper(MIN_SIZE=2, MAX_IDLE=0)
+        self.query(wrapper)
+        self.assertEqual((2, 1), (wrapper.pool.size, len(wrapper.pool.idle)))
+        wrapper.close()
+        # Idle connections expire down to MIN_SIZE
+        self.assertEqual((2, 2), (wrapper.pool.size, len(wrapper.pool.idle)))
+
+    def test_expire(self):
+        wrapper = self.wrapper(MAX_IDLE=0)
+        self.query(wrapper)
+        wrapper.close()
+        self.assertEqual((0, 1), (wrapper.pool.size, wrapper.pool.stats['expire']))
+
+    def test_threads(self):
+        errors = []
+
+        def run():
+            try:
+                for _ in range(20):
+                    wrapper = self.wrapper(MAX_SIZE=2)
+                    self.query(wrapper)
+                    wrapper.close()
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        pool, = pools.values()
+        self.assertLessEqual(pool.stats['connect'], 2)
+        self.assertEqual(160, pool.stats['connect'] + pool.stats['reuse'])
+        self.assertEqual(0, pool.status()['in_use'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs PostgreSQL')
+class PostgreSQLPoolTest(SimpleTestCase):
+    def tearDown(self):
+        close_pools()
+
+    def test_reuse(self):
+        from django_base.db.backends.postgresql_pool.base import DatabaseWrapper
+        params = {**connection.settings_dict, 'POOL': {}}
+        first = DatabaseWrapper(params)
+        first.ensure_connection()
+        raw = first.connection
+        first.close()
+        second = DatabaseWrapper(params)
+        with second.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(raw, second.connection)
+        second.close()
+
+
+@skipUnless(BENCHMARK, 'set BENCHMARK=1 to run benchmarks')
+class PoolBenchmark(SimpleTestCase):
+    """Connection setup of a request, against PostgreSQL when the tests use it."""
+    runs = 200
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        close_pools()
+        shutil.rmtree(self.directory)
+
+    def test_connect(self):
+        if connection.vendor == 'postgresql':
+            from django.db.backends.postgresql.base import DatabaseWrapper
+            from django_base.db.backends.postgresql_pool.base import \
+                DatabaseWrapper as PooledWrapper
+            params = {**connection.settings_dict, 'POOL': {}}
+        else:
+            DatabaseWrapper, PooledWrapper = sqlite3_base.DatabaseWrapper, PooledSQLiteWrapper
+            params = settings_dict('django.db.backends.sqlite3',
+                                   os.path.join(self.directory, 'pool.sqlite3'))
+        for name, wrapper_class in (('connect', DatabaseWrapper), ('pool', PooledWrapper)):
+            timings = []
+            for _ in range(self.runs):
+                start = time.perf_counter()
+                wrapper = wrapper_class(params)
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                wrapper.close()
+                timings.append(time.perf_counter() - start)
+            report(f"{connection.vendor} {name}", timings)
@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from django.core.cache import caches
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from django_base.profiling import aggregator
+from django_base.test_helpers import LOCMEM_CACHES, TestHelpers
+
+
+class ProfilingMiddlewareTest(TestCase, TestHelpers):
+    def setUp(self):
+        self.directory = directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        overrides = override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_DIR=directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        aggregator.reset()
+        self.addCleanup(aggregator.reset)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('login'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cpu;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertIn('login', aggregator.views)
+        self.assertEqual(1, aggregator.views['login']['count'])
+
+    def test_counts_queries(self):
+        response = self.client.post(reverse('login'), {'username': 'nobody', 'password': 'x'})
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+        self.assertGreater(aggregator.views['login']['sql_count'], 0)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_cache_counters(self):
+        caches['default'].clear()
+        self.client.get(reverse('login'))
+        response = self.client.get(reverse('login'))
+        self.assertIn('page_cache.hit=1', response['Server-Timing'])
+        counters = aggregator.views['login']['counters']
+        self.assertEqual({'page_cache.hit': 1, 'page_cache.miss': 1}, counters)
+
+    def test_unsampled_paths(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('home')))
+        with override_settings(PROFILING_SAMPLE_RATE=0):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('login')))
+        self.assertEqual({}, aggregator.views)
+
+    def test_report(self):
+        self.client.get(reverse('login'))
+        self.client.get(reverse('register'))
+        aggregator.flush()
+
+        out = StringIO()
+        call_command('profiling_report', stdout=out)
+        self.assertIn('login', out.getvalue())
+        self.assertIn('register', out.getvalue())
+
+        out = StringIO()
+        call_command('profiling_report', '--json', stdout=out)
+        self.assertEqual(1, json.loads(out.getvalue())['login']['count'])
+
+        call_command('profiling_report', '--reset')
+        out = StringIO()
+        call_command('profiling_report', '--json', stdout=out)
+        self.assertEqual({}, json.loads(out.getvalue()))
+
+    def test_concurrent_flushes(self):
+        self.client.get(reverse('login'))
+        threads = [threading.Thread(target=aggregator.flush) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        [name] = os.listdir(self.directory)
+        with open(os.path.join(self.directory, name), encoding='utf-8') as file:
+            self.assertEqual(1, json.load(file)['login']['count'])
+
+    def test_unwritable_directory(self):
+        # A file where the directory should be
+        path = os.path.join(self.directory, 'profiles')
+        with open(path, 'w', encoding='utf-8'):
+            pass
+        with self.settings(PROFILING_DIR=path, PROFILING_FLUSH_INTERVAL=0), \
+                self.assertLogs('django_base.profiling', 'ERROR'):
+            response = self.client.get(reverse('login'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, aggregator.views['login']['count'])
@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django_base.db.router import (
+    STICKY_COOKIE, PrimaryReplicaRouter, RoutingState, current_state, use_primary,
+)
+from django_base.middleware import PrimaryStickinessMiddleware
+from users.tests.test_data import create_user_jake
+
+UserModel = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class RouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def route(self, state):
+        token = current_state.set(state)
+        self.addCleanup(current_state.reset, token)
+
+    def test_outside_requests(self):
+        self.assertEqual('default', self.router.db_for_read(UserModel))
+
+    def test_reads_from_replica(self):
+        self.route(RoutingState())
+        self.assertEqual('replica', self.router.db_for_read(UserModel))
+        self.assertEqual('default', self.router.db_for_write(UserModel))
+
+    def test_reads_own_writes(self):
+        self.route(RoutingState())
+        self.router.db_for_write(UserModel)
+        self.assertEqual('default', self.router.db_for_read(UserModel))
+
+    def test_use_primary(self):
+        self.route(RoutingState())
+        with use_primary():
+            self.assertEqual('default', self.router.db_for_read(UserModel))
+        self.assertEqual('replica', self.router.db_for_read(UserModel))
+
+    def test_replicas_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'users'))
+        self.assertFalse(self.router.allow_migrate('replica', 'users'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_STICKY_SECONDS=5)
+class PrimaryStickinessMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.routed = []
+
+    def view(self, write: bool):
+        def get_response(request):
+            if write:
+                PrimaryReplicaRouter().db_for_write(UserModel)
+            self.routed.append(PrimaryReplicaRouter().db_for_read(UserModel))
+            return HttpResponse()
+        return PrimaryStickinessMiddleware(get_response)
+
+    def test_read(self):
+        response = self.view(write=False)(self.factory.get('/'))
+        self.assertEqual(['replica'], self.routed)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        self.assertIsNone(current_state.get())
+
+    def test_write_sticks_to_primary(self):
+        response = self.view(write=True)(self.factory.get('/'))
+        self.assertEqual(['default'], self.routed)
+        self.assertEqual(5, response.cookies[STICKY_COOKIE]['max-age'])
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.view(write=False)(request)
+        self.assertEqual(['default', 'default'], self.routed)
+
+    def test_unsafe_method_reads_from_primary(self):
+        response = self.view(write=False)(self.factory.post('/'))
+        self.assertEqual(['default'], self.routed)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_without_replicas(self):
+        with self.settings(DATABASE_REPLICAS=[]), self.assertRaises(MiddlewareNotUsed):
+            self.view(write=False)
+
+
+REPLICA = {'ENGINE': 'django.db.backends.sqlite3', 'TEST': {}}
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaTest(TestCase):
+    """A SQLite file stands in for the replica, holding a stale copy of the users."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Not known by the test runner, which sets up the declared databases
+        cls.databases = {'default', 'replica'}
+        cls.directory = tempfile.mkdtemp()
+        patcher = mock.patch.dict(connections.databases, replica={
+            **REPLICA, 'NAME': os.path.join(cls.directory, 'replica.sqlite3')})
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+        cls.addClassCleanup(shutil.rmtree, cls.directory)
+        cls.addClassCleanup(connections['replica'].close)
+        with connections['replica'].schema_editor() as editor:
+            editor.create_model(UserModel)
+            editor.create_model(Session)
+        super().setUpClass()
+
+    def setUp(self):
+        self.user = create_user_jake()
+        UserModel.objects.using('replica').create(
+            pk=self.user.pk, username=self.user.username, email=self.user.email,
+            password=self.user.password,
+            first_name='Jake', last_name='(stale)',
+        )
+        self.client.force_login(self.user)
+        # Replicated session
+        session = Session.objects.get()
+        Session.objects.using('replica').create(
+            session_key=session.session_key, session_data=session.session_data,
+            expire_date=session.expire_date)
+
+    def test_profile_read_from_replica(self):
+        response = self.client.get(reverse('profile'))
+        self.assertContains(response, '(stale)')
+
+    def test_read_your_writes(self):
+        response = self.client.post(reverse('edit_profile'), {
+            'username': 'baracuda', 'first_name': 'Jake', 'last_name': 'Santiago'})
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        response = self.client.get(reverse('profile'))
+        self.assertNotContains(response, '(stale)')
+        self.assertContains(response, 'Santiago')
@@ -0,0 +1,80 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_base.test_helpers import LOCMEM_CACHES, TestHelpers
+from users.cache import user_cache
+from users.tests.test_data import create_user_jake
+
+SIGNED_COOKIES = 'django.contrib.sessions.backends.signed_cookies'
+
+
+class SessionEngineTest(TestCase, TestHelpers):
+    def setUp(self):
+        self.user = create_user_jake()
+
+    def login(self):
+        response = self.client.post(reverse('login'),
+                                    {'username': 'baracuda', 'password': 'rosa1234'})
+        self.assertEqual(302, response.status_code)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_cached_db_read_only_page(self):
+        caches['default'].clear()
+        user_cache.clear()
+        self.login()
+        self.client.get(reverse('profile'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(200, self.client.get(reverse('profile')).status_code)
+        self.assertEqual([], [query['sql'] for query in queries])
+
+    @override_settings(SESSION_ENGINE=SIGNED_COOKIES)
+    def test_signed_cookies(self):
+        self.login()
+        self.assertFalse(Session.objects.exists())
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.user, response.context['user'])
+
+    def test_messages_in_cookie(self):
+        self.login()
+        response = self.client.post(reverse('update_email'),
+                                    {'next_email': 'jake@b99.com'})
+        self.assertIn('messages', response.cookies)
+        response = self.client.get(reverse('profile'))
+        self.assert_message(response, 'Please check your mailbox to confirm your new email')
+        session = Session.objects.get().get_decoded()
+        self.assertNotIn('_messages', session)
+
+
+class SweepSessionsTest(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(session_key=f"expired{i}", session_data='', expire_date=now - timedelta(days=1))
+            for i in range(25)
+        )
+        Session.objects.create(session_key='current', session_data='',
+                               expire_date=now + timedelta(days=1))
+
+    def test_sweep(self):
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('sweep_sessions', '--batch-size=10', stdout=out)
+        self.assertIn('25 expired sessions deleted', out.getvalue())
+        self.assertEqual(['current'], list(Session.objects.values_list('session_key', flat=True)))
+        deletes = [query for query in queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(3, len(deletes))
+
+    @override_settings(SESSION_ENGINE=SIGNED_COOKIES)
+    def test_nothing_to_sweep(self):
+        out = StringIO()
+        call_command('sweep_sessions', stdout=out)
+        self.assertIn('nothing to sweep', out.getvalue())
+        self.assertEqual(26, Session.objects.count())
@@ -0,0 +1,129 @@
+import importlib
+import os
+import subprocess
+import sys
+import time
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.db import connection
+from django.template import engines
+from django.test import SimpleTestCase, TestCase, override_settings
+from django_base.db import health
+from django_base.test_helpers import BENCHMARK, report
+from django_base.warmup import project_templates, warm_up
+
+FIRST_REQUEST = """
+import time
+import django
+from django.test import Client
+from django.urls import reverse
+django.setup()
+if {warm_up}:
+    from django_base.warmup import warm_up
+    warm_up()
+url = reverse('login')
+# Outside the test runner, ALLOWED_HOSTS doesn't include testserver
+start = time.perf_counter()
+response = Client(HTTP_HOST='localhost').get(url)
+print(time.perf_counter() - start)
+assert response.status_code == 200, response.status_code
+"""
+
+
+@override_settings(DB_HEALTH_CHECK_IDLE=30)
+class HealthCheckTest(TestCase):
+    def setUp(self):
+        connection.ensure_connection()
+        self.in_atomic_block = connection.in_atomic_block
+
+    def tearDown(self):
+        connection.in_atomic_block = self.in_atomic_block
+        connection.idle_since = None
+
+    def test_closes_unusable_idle_connection(self):
+        connection.in_atomic_block = False
+        connection.idle_since = time.monotonic() - 60
+        with mock.patch.object(connection, 'is_usable', return_value=False), \
+                mock.patch.object(connection, 'close') as close:
+            health.check_connections()
+        close.assert_called_once_with()
+
+    def test_keeps_recently_used_connection(self):
+        connection.in_atomic_block = False
+        health.mark_idle()
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            health.check_connections()
+        is_usable.assert_not_called()
+
+    def test_skips_atomic_block(self):
+        connection.idle_since = time.monotonic() - 60
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            health.check_connections()
+        is_usable.assert_not_called()
+
+
+class WarmUpTest(SimpleTestCase):
+    def test_project_templates(self):
+        templates = set(project_templates())
+        self.assertIn('home.html', templates)
+        self.assertIn('users/login.html', templates)
+        self.assertNotIn('admin/base.html', templates)
+
+    def test_warm_up(self):
+        with mock.patch.object(engines['django'], 'get_template') as get_template:
+            warm_up()
+        self.assertEqual(len(list(project_templates())), get_template.call_count)
+
+
+class ProductionSettingsTest(SimpleTestCase):
+    environ = {'DJANGO_SECRET_KEY': 'secret', 'DJANGO_ALLOWED_HOSTS': 'a.test,b.test',
+               'DJANGO_CACHE_BACKEND': 'django.core.cache.backends.memcached.PyLibMCCache'}
+
+    def test_settings(self):
+        with mock.patch.dict(os.environ, self.environ, DJANGO_CONN_MAX_AGE='60'):
+            production = importlib.import_module('django_base.settings.production')
+            del sys.modules['django_base.settings.production']
+        common = importlib.import_module('django_base.settings.common')
+        self.assertFalse(production.DEBUG)
+        self.assertEqual(['a.test', 'b.test'], production.ALLOWED_HOSTS)
+        self.assertEqual(60, production.DATABASES['default']['CONN_MAX_AGE'])
+        self.assertEqual('django_base.db.backends.postgresql_pool',
+                         production.DATABASES['default']['ENGINE'])
+        self.assertFalse(production.TEMPLATES[0]['APP_DIRS'])
+        self.assertTrue(production.WARM_UP)
+        # The common settings are left untouched
+        self.assertNotIn('CONN_MAX_AGE', common.DATABASES['default'])
+        self.assertEqual('django.db.backends.postgresql', common.DATABASES['default']['ENGINE'])
+        self.assertNotIn('loaders', common.TEMPLATES[0]['OPTIONS'])
+
+    def test_shared_cache_required(self):
+        with mock.patch.dict(os.environ, self.environ), self.assertRaises(KeyError):
+            del os.environ['DJANGO_CACHE_BACKEND']
+            importlib.import_module('django_base.settings.production')
+
+
+@skipUnless(BENCHMARK, 'set BENCHMARK=1 to run benchmarks')
+class StartupBenchmark(SimpleTestCase):
+    runs = 10
+
+    def run_python(self, args, **environ):
+        return subprocess.run(
+            [sys.executable, *args], cwd=settings.BASE_DIR, check=True,
+            capture_output=True, text=True, env={**os.environ, **environ},
+        ).stdout
+
+    def test_check(self):
+        for name, environ in (('setuptools distutils', {'SETUPTOOLS_USE_DISTUTILS': 'local'}),
+                              ('stdlib distutils', {'SETUPTOOLS_USE_DISTUTILS': 'stdlib'})):
+            timings = []
+            for _ in range(self.runs):
+                start = time.perf_counter()
+                self.run_python(['manage.py', 'check'], **environ)
+                timings.append(time.perf_counter() - start)
+            report(f"manage.py check, {name}", timings)
+
+    def test_first_request(self):
+        for warm in (False, True):
+            timings = [float(self.run_python(['-c', FIRST_REQUEST.format(warm_up=warm)]))
+                       for _ in range(self.runs)]
+            report(f"first request, warm up {warm}", timings)
@@ -0,0 +1,122 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django_base import storage
+from django_base.middleware import StaticFilesMiddleware
+
+STYLES = "body { color: #222; }\n" * 100
+SCRIPT = "console.log('loaded');\n" * 100
+
+
+def not_found(request):
+    return None
+
+
+class StaticFilesTestMixin:
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.root)
+        for name, content in (('index-bundle.css', STYLES), ('index-bundle.js', SCRIPT),
+                              ('robots.txt', "User-agent: *\n")):
+            with open(os.path.join(self.source, name), 'w', encoding='utf-8') as file:
+                file.write(content)
+
+    def collectstatic(self):
+        with override_settings(
+                STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root,
+                STATICFILES_STORAGE='django_base.storage.CompressedManifestStaticFilesStorage'):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(self.root, 'staticfiles.json'), encoding='utf-8') as manifest:
+            return json.load(manifest)['paths']
+
+
+class CompressedManifestStorageTest(StaticFilesTestMixin, SimpleTestCase):
+    def test_hashed_and_compressed(self):
+        paths = self.collectstatic()
+        hashed = paths['index-bundle.css']
+        self.assertRegex(hashed, r'^index-bundle\.[0-9a-f]{12}\.css$')
+        with gzip.open(os.path.join(self.root, hashed + '.gz'), 'rt') as file:
+            self.assertEqual(file.read(), STYLES)
+
+    def test_small_files_not_compressed(self):
+        paths = self.collectstatic()
+        self.assertFalse(os.path.exists(os.path.join(self.root, paths['robots.txt'] + '.gz')))
+
+    def test_original_names_not_compressed(self):
+        self.collectstatic()
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'index-bundle.css.gz')))
+
+    def test_brotli_optional(self):
+        with mock.patch.object(storage, 'brotli', None):
+            paths = self.collectstatic()
+        self.assertFalse(os.path.exists(os.path.join(self.root, paths['index-bundle.js'] + '.br')))
+        self.assertTrue(os.path.exists(os.path.join(self.root, paths['index-bundle.js'] + '.gz')))
+
+
+@override_settings(STATIC_SERVE=True, STATIC_URL='/static/', STATIC_MAX_AGE=60)
+class StaticFilesMiddlewareTest(StaticFilesTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.paths = self.collectstatic()
+        with self.settings(STATIC_ROOT=self.root):
+            self.middleware = StaticFilesMiddleware(not_found)
+        self.factory = RequestFactory()
+
+    def get(self, name, method='get', **headers):
+        return self.middleware(getattr(self.factory, method)(f'/static/{name}', **headers))
+
+    def test_hashed_file_immutable(self):
+        response = self.get(self.paths['index-bundle.css'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(b''.join(response.streaming_content).decode(), STYLES)
+
+    def test_unhashed_file_revalidated(self):
+        response = self.get('robots.txt')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        not_modified = self.get('robots.txt', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_compressed_variant(self):
+        response = self.get(self.paths['index-bundle.js'], HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertEqual(gzip.decompress(body).decode(), SCRIPT)
+
+    def test_refused_encoding(self):
+        name = self.paths['index-bundle.js']
+        response = self.get(name, HTTP_ACCEPT_ENCODING='br;q=0, gzip;q=0.5')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response = self.get(name, HTTP_ACCEPT_ENCODING='gzip; q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_identity_without_accept_encoding(self):
+        response = self.get(self.paths['index-bundle.js'])
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_head(self):
+        response = self.get(self.paths['index-bundle.css'], method='head',
+                            HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_unknown_files_passed_through(self):
+        self.assertIsNone(self.get('missing.css'))
+        self.assertIsNone(self.get(self.paths['index-bundle.css'] + '.gz'))
+        self.assertIsNone(self.middleware(self.factory.get('/login/')))
+
+    def test_disabled(self):
+        with self.settings(STATIC_SERVE=False), self.assertRaises(MiddlewareNotUsed):
+            StaticFilesMiddleware(not_found)
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock, skipUnless
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from django_base import markdown_cache
+from django_base.markdown_cache import cached_markdown_from_file
+from django_base.test_helpers import BENCHMARK, LOCMEM_CACHES, report
+from django_base.views import README
+
+
+class MarkdownCacheTest(TestCase):
+    def setUp(self):
+        markdown_cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'page.md')
+        self.write('# Title')
+
+    def write(self, text: str) -> None:
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+    def test_render_once(self):
+        self.assertEqual('<h1>Title</h1>', cached_markdown_from_file(self.path))
+        with mock.patch.object(markdown_cache, 'markdown_from_file') as render:
+            self.assertEqual('<h1>Title</h1>', cached_markdown_from_file(self.path))
+        render.assert_not_called()
+
+    def test_file_change(self):
+        cached_markdown_from_file(self.path)
+        self.write('## New title')
+        self.assertEqual('<h2>New title</h2>', cached_markdown_from_file(self.path))
+
+    @override_settings(CACHES=LOCMEM_CACHES, MARKDOWN_CACHE_ALIAS='default')
+    def test_shared_cache(self):
+        cached_markdown_from_file(self.path)
+        markdown_cache.clear()
+        with mock.patch.object(markdown_cache, 'markdown_from_file') as render:
+            self.assertEqual('<h1>Title</h1>', cached_markdown_from_file(self.path))
+        render.assert_not_called()
+
+
+class HomeViewTest(TestCase):
+    def setUp(self):
+        markdown_cache.clear()
+
+    def test_home_page(self):
+        response = self.client.get(reverse('home'))
+        self.assertEqual(200, response.status_code)
+        self.assertIn('<h1>DJANGO BASE</h1>', response.content.decode())
+
+    def test_readme_rendered_once(self):
+        self.client.get(reverse('home'))
+        with mock.patch('markdown.markdown') as render, \
+                mock.patch('builtins.open') as open_file:
+            self.client.get(reverse('home'))
+        render.assert_not_called()
+        open_file.assert_not_called()
+
+    @skipUnless(BENCHMARK, 'set BENCHMARK=1 to run benchmarks')
+    def test_benchmark_home_page(self):
+        runs = 200
+        url = reverse('home')
+        for name, clear in (('cold', markdown_cache.clear), ('cached', lambda: None)):
+            timings = []
+            for _ in range(runs):
+                clear()
+                start = time.perf_counter()
+                self.client.get(url)
+                timings.append(time.perf_counter() - start)
+            report(f"home page, {name} readme", timings)
+        timings = []
+        for _ in range(runs):
+            markdown_cache.clear()
+            start = time.perf_counter()
+            cached_markdown_from_file(README)
+            timings.append(time.perf_counter() - start)
+        report("readme rendering", timings)
@@ -0,0 +1,42 @@
+"""
+Work done by the first request of each process, moved to the worker startup
+(and shared by the forked workers with `gunicorn --preload`).
+"""
+import os
+from django.apps import apps
+from django.conf import settings
+from django.template import engines
+from django.urls import reverse
+from django.utils import translation
+
+
+def project_templates():
+    """Template names of the project's apps, the admin ones being rarely used."""
+    for app_config in apps.get_app_configs():
+        directory = os.path.join(app_config.path, 'templates')
+        if not app_config.path.startswith(settings.BASE_DIR) or not os.path.isdir(directory):
+            continue
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if file.endswith(('.html', '.txt')):
+                    yield os.path.relpath(os.path.join(root, file), directory)
+
+
+def warm_up() -> None:
+    # Compiled templates are kept by the cached loader
+    for engine in engines.all():
+        for name in project_templates():
+            engine.get_template(name)
+    # Imports the views and builds the URL resolver
+    reverse('home')
+    preload_catalogs()
+
+
+def preload_catalogs() -> None:
+    """
+    Load the compiled catalogs of every language, which Django merges for
+    all the installed apps on the first activation of each language.
+    """
+    for language, _ in settings.LANGUAGES:
+        with translation.override(language):
+            translation.gettext('')
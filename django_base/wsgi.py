@@ -8,9 +8,19 @@ https://docs.djangoproject.com/en/1.11/howto/deployment/wsgi/
 """
 
 import os
+import sys
 
-from django.core.wsgi import get_wsgi_application
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_base.settings.production")
+# Django 3.1 imports distutils, which setuptools otherwise replaces with its own
+# copy, importing pkg_resources and slowing the startup by a few hundred ms.
+if sys.version_info < (3, 12):
+    os.environ.setdefault("SETUPTOOLS_USE_DISTUTILS", "stdlib")
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_base.settings")
+from django.conf import settings  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
 
 application = get_wsgi_application()
+
+if settings.WARM_UP:
+    from django_base.warmup import warm_up
+    warm_up()
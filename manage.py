@@ -7,6 +7,9 @@ if __name__ == "__main__":
         os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_base.settings.test")
     else:
         os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_base.settings.development")
+    # See django_base/wsgi.py
+    if sys.version_info < (3, 12):
+        os.environ.setdefault("SETUPTOOLS_USE_DISTUTILS", "stdlib")
 
     try:
         from django.core.management import execute_from_command_line
@@ -1,9 +1,118 @@
 
+import json
+from datetime import datetime
+from typing import Optional, Tuple
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from .models import OutboundEmail
 
 UserModel = get_user_model()
 
+CURSOR_VAR = 'cursor'
+# Counts estimated above this number of rows are not worth an exact COUNT(*)
+EXACT_COUNT_LIMIT = 10_000
+
+
+def estimated_count(queryset) -> Tuple[int, bool]:
+    """Row count and whether it is estimated, from the planner statistics on PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        rows = plan[0]['Plan']['Plan Rows']
+        if rows > EXACT_COUNT_LIMIT:
+            return rows, True
+    return queryset.count(), False
+
+
+def encode_cursor(direction: str, created_at: datetime, pk: int) -> str:
+    return urlsafe_base64_encode(force_bytes(f"{direction}|{created_at.isoformat()}|{pk}"))
+
+
+def decode_cursor(cursor: str) -> Tuple[str, datetime, int]:
+    try:
+        direction, created_at, pk = force_str(urlsafe_base64_decode(cursor)).split('|')
+        created_at = parse_datetime(created_at)
+        if direction not in ('next', 'previous') or created_at is None:
+            raise ValueError(cursor)
+        return direction, created_at, int(pk)
+    except ValueError as error:
+        raise IncorrectLookupParameters from error
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Pages through the users on the (created_at, id) index instead of an
+    OFFSET, which reads every skipped row, with an estimated count.
+    """
+    next_url: Optional[str] = None
+    previous_url: Optional[str] = None
+    first_url: Optional[str] = None
+    count_estimated = False
+
+    def __init__(self, request, *args, **kwargs):
+        # Read from the query string like PAGE_VAR, so that the links of the
+        # filters and the search form start over from the first page
+        self.cursor = request.GET.get(CURSOR_VAR)
+        super().__init__(request, *args, **kwargs)
+
+    def get_queryset(self, request):
+        # First use of the params set by ChangeList.__init__
+        self.params.pop(CURSOR_VAR, None)
+        return super().get_queryset(request)
+
+    def get_results(self, request):
+        self.result_count, self.count_estimated = estimated_count(self.queryset)
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.can_show_all = False
+        self.paginator = None
+
+        queryset = self.queryset
+        cursor = self.cursor
+        if cursor:
+            direction, created_at, pk = decode_cursor(cursor)
+            # created_at bounds the index scan, id breaks the ties
+            if direction == 'next':
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(id__lt=pk), created_at__lte=created_at)
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(id__gt=pk), created_at__gte=created_at
+                ).reverse()
+        results = list(queryset[:self.list_per_page + 1])
+        has_more = len(results) > self.list_per_page
+        results = results[:self.list_per_page]
+        if cursor and direction == 'previous':
+            results.reverse()
+        self.result_list = results
+        has_next = has_more if not cursor or direction == 'next' else True
+        has_previous = bool(cursor) and (direction == 'next' or has_more)
+        self.multi_page = has_next or has_previous
+        if results and has_next:
+            self.next_url = self.cursor_url('next', results[-1])
+        if results and has_previous:
+            self.previous_url = self.cursor_url('previous', results[0])
+            self.first_url = self.get_query_string()
+
+    def cursor_url(self, direction: str, user) -> str:
+        return self.get_query_string(
+            {CURSOR_VAR: encode_cursor(direction, user.created_at, user.pk)}
+        )
+
 
 @admin.register(UserModel)
 class UserAdmin(admin.ModelAdmin):
@@ -19,3 +128,36 @@ class UserAdmin(admin.ModelAdmin):
         "is_staff",
         "is_superuser",
     )
+    # Prefix searches are served by the UPPER() indexes
+    search_fields = (
+        "^email",
+        "^username",
+    )
+    # Keyset pagination needs a fixed order, matching the index
+    ordering = ("-created_at", "-id")
+    sortable_by = ()
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):  # pylint: disable=no-self-use
+        return KeysetChangeList
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "to",
+        "subject",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+    )
+    list_filter = (
+        "status",
+    )
+    actions = ["requeue"]
+
+    def requeue(self, request, queryset):  # pylint: disable=no-self-use
+        queryset.update(status=OutboundEmail.PENDING, attempts=0,
+                        next_attempt_at=timezone.now())
+    requeue.short_description = "Send again"  # type: ignore
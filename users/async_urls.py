@@ -0,0 +1,13 @@
+from django.urls import path
+from .views import (
+    AsyncEmailValidationView, AsyncProfileView, AsyncRegisterView, AsyncUpdateEmailView,
+)
+
+# Served under ASGI in place of the sync views of the same name, see users.urls
+urlpatterns = [
+    path('register/', AsyncRegisterView.as_view(), name='register'),
+    path('', AsyncProfileView.as_view(), name='profile'),
+    path('activation/<str:validation_token>/', AsyncEmailValidationView.as_view(),
+         name='validate_email'),
+    path('email/edit/', AsyncUpdateEmailView.as_view(), name='update_email'),
+]
@@ -1,27 +1,108 @@
+import re
+import time
+from collections import Counter
+from datetime import datetime
 from typing import Optional
 import jwt
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from users.models import EmailUser
+from django_base.profiling import count
+from .cache import LRUCache
 
-UserModel = get_user_model()
+ACTIVATION = 'activation'
+EMAIL_CHANGE = 'email_change'
 
+# Every token we issue shares this header, and an HS256 signature is 32 bytes,
+# 43 characters once base64url encoded without padding.
+TOKEN_HEADER = jwt.encode({}, settings.SECRET_KEY, algorithm="HS256").split('.')[0]
+TOKEN_PATTERN = re.compile(
+    rf'{TOKEN_HEADER}\.[A-Za-z0-9_-]{{1,{settings.TOKEN_MAX_LENGTH}}}\.[A-Za-z0-9_-]{{43}}'
+)
 
-def user_from_token(token) -> Optional[EmailUser]:
-    if body := decode_token(token):
-        return token_user(body)     # type: ignore
+verified_tokens = LRUCache(settings.TOKEN_CACHE_SIZE)
+rejected_tokens = LRUCache(settings.TOKEN_CACHE_SIZE)
+token_stats: Counter = Counter()
+
+
+def make_token(purpose: str, issued_at: datetime, **claims) -> str:
+    return jwt.encode(
+        {**claims, 'purpose': purpose,
+         'exp': issued_at + settings.VALIDATION_TOKEN_TTL},
+        settings.SECRET_KEY, algorithm="HS256"
+    )
+
+
+def user_from_token(token: str, purpose: str = EMAIL_CHANGE):
+    if body := decode_token(token, purpose):
+        if user := token_user(body):
+            return user
+        reject(token)
     return None
 
 
-def decode_token(token: str) -> Optional[dict]:
+def activate_from_token(token: str) -> bool:
+    """
+    Whether the user of the token is active, activating it: following the
+    link again, or a mail scanner fetching it first, still confirms.
+    """
+    if body := decode_token(token, ACTIVATION):
+        UserModel = get_user_model()    # pylint: disable=invalid-name
+        return UserModel.activate(body['user_id'], body['user_email']) or \
+            UserModel.objects.filter(
+                id=body['user_id'], email=body['user_email'], is_active=True
+            ).exists()
+    return False
+
+
+def decode_token(token: str, purpose: str) -> Optional[dict]:
+    body = verify_token(token)
+    return body if body and body['purpose'] == purpose else None
+
+
+def verify_token(token: str) -> Optional[dict]:
+    """
+    Signature and expiry check, cached for valid and invalid tokens alike.
+    Malformed tokens are rejected before any cache lookup or cryptography.
+    """
+    if len(token) > settings.TOKEN_MAX_LENGTH or not TOKEN_PATTERN.fullmatch(token):
+        record('malformed')
+        return None
+    if rejected_tokens.get(token):
+        record('rejected_hit')
+        return None
+    body = verified_tokens.get(token)
+    if body is not None and body['exp'] > time.time():
+        record('hit')
+        return body
+    record('miss')
     try:
-        return jwt.decode(token, settings.SECRET_KEY,
-                          algorithms="HS256")  # type: ignore
-    except jwt.exceptions.DecodeError:
+        body = jwt.decode(token, settings.SECRET_KEY, algorithms="HS256",
+                          options={'require': ['exp', 'purpose']})
+    except jwt.exceptions.InvalidTokenError:
+        reject(token)
         return None
+    verified_tokens.set(token, body)
+    return body
+
+
+def record(event: str) -> None:
+    token_stats[event] += 1
+    count(f"token.{event}")
+
+
+def reject(token: str) -> None:
+    verified_tokens.delete(token)
+    rejected_tokens.set(token, True)
+
+
+def clear_token_caches() -> None:
+    verified_tokens.clear()
+    rejected_tokens.clear()
+    token_stats.clear()
 
 
-def token_user(body: dict) -> Optional[EmailUser]:
+def token_user(body: dict):
+    UserModel = get_user_model()    # pylint: disable=invalid-name
     try:
         return UserModel.objects.get(
             id=body['user_id'], email=body['user_email']
@@ -1,30 +1,42 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
-from django.db.models import Q
+from django.core.exceptions import PermissionDenied
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Upper
+from .cache import user_cache
+from .throttle import login_allowed
 
 
-class CustomBackend(ModelBackend):
-    def authenticate(self, request, username=None, password=None, **kwargs):
-        UserModel = get_user_model()    # pylint: disable=invalid-name
-        try:
-            user = UserModel.objects.filter(
-                Q(username__iexact=username) |
-                Q(email__iexact=username)
-            ).distinct()
+def login_queryset(identifier: str):
+    # Matches the UPPER() indexes created in migration 0004, so the lookup
+    # is a single index scan on both columns instead of a sequential scan.
+    UserModel = get_user_model()    # pylint: disable=invalid-name
+    value = Upper(Value(identifier, output_field=CharField()))
+    return UserModel.objects.annotate(
+        username_upper=Upper('username'),
+        email_upper=Upper('email'),
+    ).filter(Q(username_upper=value) | Q(email_upper=value))
 
-        except UserModel.DoesNotExist:
-            return None
 
-        if user.exists():
-            user_obj = user.first()
-            if user_obj.check_password(password):
-                return user_obj
+class CustomBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None or password is None:
             return None
+        if not login_allowed(request, username):
+            # Stops authenticate() from trying the other backends
+            raise PermissionDenied
+        user_obj = login_queryset(username).first()
+        if user_obj and user_obj.check_password(password):
+            return user_obj
         return None
 
     def get_user(self, user_id):
+        if user := user_cache.get(user_id):
+            return user
         UserModel = get_user_model()    # pylint: disable=invalid-name
         try:
-            return UserModel.objects.get(pk=user_id)
+            user = UserModel.objects.get(pk=user_id)
         except UserModel.DoesNotExist:
             return None
+        user_cache.set(user)
+        return user
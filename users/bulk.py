@@ -0,0 +1,406 @@
+"""
+Batch operations on users, used by the `import_users`, `export_users`,
+`rehash_passwords` and `seed_users` commands.
+
+Rows are read, validated, hashed and written one batch at a time, so the
+memory used does not depend on the size of the table or file.
+"""
+import csv
+import io
+import json
+import random
+import re
+import unicodedata
+from collections import Counter
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Upper
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .cache import user_cache
+from .hashers import WrappedPBKDF2PasswordHasher, needs_wrapping
+
+UserModel = get_user_model()
+
+FORMATS = ('csv', 'jsonl')
+# Imported rows have the same columns, plus an optional plain text `password`
+# hashed on import when `password_hash` is empty.
+EXPORT_FIELDS = ('email', 'username', 'first_name', 'last_name', 'is_active',
+                 'is_staff', 'date_joined', 'password_hash')
+
+EMAIL_PATTERN = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s.]+')
+USERNAME_PATTERN = re.compile(UnicodeUsernameValidator.regex)
+TRUE_VALUES = frozenset(('1', 't', 'true', 'y', 'yes'))
+# Passwords sent to a hashing process at once
+HASH_CHUNK_SIZE = 16
+
+Row = Tuple[int, dict]
+
+
+def guess_format(path: str) -> str:
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(file: TextIO, fmt: str) -> Iterator[dict]:
+    if fmt == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_rows(file: TextIO, fmt: str, rows: Iterable[dict]) -> int:
+    written = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(file, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for written, row in enumerate(rows, 1):
+            writer.writerow(row)
+        return written
+    for written, row in enumerate(rows, 1):
+        file.write(f"{json.dumps(row)}\n")
+    return written
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def export_rows(batch_size: Optional[int] = None) -> Iterator[dict]:
+    # iterator() uses a server-side cursor on PostgreSQL
+    users = UserModel.objects.order_by('pk').values_list(
+        'email', 'username', 'first_name', 'last_name', 'is_active',
+        'is_staff', 'date_joined', 'password',
+    )
+    for values in users.iterator(chunk_size=batch_size or settings.USER_BULK_BATCH_SIZE):
+        row = dict(zip(EXPORT_FIELDS, values))
+        row['date_joined'] = row['date_joined'].isoformat()
+        yield row
+
+
+def as_bool(value, default: bool) -> bool:
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def as_datetime(value) -> Optional[datetime]:
+    if not value:
+        return timezone.now()
+    try:
+        parsed = parse_datetime(str(value))
+    except ValueError:
+        return None
+    if parsed and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def clean_row(row: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """Normalize a row as `create_user` would, without the per-row full_clean."""
+    email = UserModel.objects.normalize_email((row.get('email') or '').strip())
+    username = unicodedata.normalize('NFKC', (row.get('username') or '').strip())
+    if len(email) > 254 or not EMAIL_PATTERN.fullmatch(email):
+        return None, f"invalid email {email!r}"
+    if len(username) > 150 or not USERNAME_PATTERN.match(username):
+        return None, f"invalid username {username!r}"
+    date_joined = as_datetime(row.get('date_joined'))
+    if date_joined is None:
+        return None, f"invalid date_joined {row['date_joined']!r}"
+    return {
+        'email': email,
+        'username': username,
+        'first_name': (row.get('first_name') or '')[:150],
+        'last_name': (row.get('last_name') or '')[:150],
+        'is_active': as_bool(row.get('is_active'), True),
+        'is_staff': as_bool(row.get('is_staff'), False),
+        'date_joined': date_joined,
+        'password': row.get('password_hash') or None,
+        'raw_password': row.get('password') or None,
+    }, None
+
+
+def taken(field: str, values: Iterable[str]) -> set:
+    """Values of a batch already used, in one query backed by the UPPER() indexes."""
+    return set(
+        UserModel.objects.annotate(upper=Upper(field))
+        .filter(upper__in=[value.upper() for value in values])
+        .values_list('upper', flat=True)
+    )
+
+
+def hash_passwords(passwords: List[Optional[str]],
+                   executor: Optional[Executor] = None) -> List[str]:
+    # Hashing is CPU bound: a process pool uses every core despite the GIL.
+    # make_password(None) sets an unusable password.
+    if executor is None:
+        return list(map(make_password, passwords))
+    return list(executor.map(make_password, passwords, chunksize=HASH_CHUNK_SIZE))
+
+
+def setup_worker() -> None:
+    """Initializer of the hashing processes, needed with the spawn start method."""
+    django.setup()
+
+
+def insert_fields() -> list:
+    # _meta is the documented Model Options API, despite its name
+    # pylint: disable=protected-access
+    return [field for field in UserModel._meta.concrete_fields if not field.primary_key]
+
+
+def copy_users(users: List) -> None:
+    """Insert with COPY, several times faster than INSERT on PostgreSQL."""
+    fields = insert_fields()
+    copy_rows(fields, ([field.get_db_prep_save(field.pre_save(user, True), connection)
+                        for field in fields] for user in users))
+
+
+def copy_rows(fields: list, rows: Iterable[list]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    writer.writerows(rows)
+    buffer.seek(0)
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    nullable = ', '.join(connection.ops.quote_name(field.column)
+                         for field in fields if field.null)
+    options = f'FORMAT csv, FORCE_NULL ({nullable})' if nullable else 'FORMAT csv'
+    table = UserModel._meta.db_table  # pylint: disable=protected-access
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {table} ({columns}) FROM STDIN WITH ({options})',
+            buffer,
+        )
+
+
+def insert_rows(fields: list, rows: Iterable[list]) -> None:
+    """INSERT the rows with a single executemany(), where COPY is not available."""
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    table = UserModel._meta.db_table  # pylint: disable=protected-access
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} ({columns}) VALUES ({placeholders})',
+            list(rows),
+        )
+
+
+class UserImporter:
+    def __init__(self, batch_size: Optional[int] = None, executor: Optional[Executor] = None,
+                 use_copy: Optional[bool] = None,
+                 on_error: Optional[Callable[[int, str], None]] = None):
+        self.batch_size = batch_size or settings.USER_BULK_BATCH_SIZE
+        self.executor = executor
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.on_error = (lambda line, message: None) if on_error is None else on_error
+        self.stats: Counter = Counter()
+
+    def error(self, line: int, message: str) -> None:
+        self.stats['skipped'] += 1
+        self.on_error(line, message)
+
+    def run(self, rows: Iterable[dict]) -> Counter:
+        for batch in batched(enumerate(rows, 1), self.batch_size):
+            self.import_batch(batch)
+        return self.stats
+
+    def import_batch(self, batch: List[Row]) -> None:
+        rows = self.validate(batch)
+        if not rows:
+            return
+        unhashed = [values for _, values in rows if not values['password']]
+        passwords = hash_passwords([values['raw_password'] for values in unhashed],
+                                   self.executor)
+        for values, password in zip(unhashed, passwords):
+            values['password'] = password
+        users = []
+        for line, values in rows:
+            del values['raw_password']
+            users.append((line, UserModel(**values)))
+        self.insert(users)
+
+    def validate(self, batch: List[Row]) -> List[Row]:
+        rows: List[Row] = []
+        emails, usernames = set(), set()
+        for line, row in batch:
+            values, message = clean_row(row)
+            if values is None:
+                self.error(line, str(message))
+            elif values['email'].upper() in emails:
+                self.error(line, f"duplicate email {values['email']!r}")
+            elif values['username'].upper() in usernames:
+                self.error(line, f"duplicate username {values['username']!r}")
+            else:
+                emails.add(values['email'].upper())
+                usernames.add(values['username'].upper())
+                rows.append((line, values))
+        taken_emails = taken('email', emails)
+        taken_usernames = taken('username', usernames)
+        valid = []
+        for line, values in rows:
+            if values['email'].upper() in taken_emails:
+                self.error(line, f"email {values['email']!r} already exists")
+            elif values['username'].upper() in taken_usernames:
+                self.error(line, f"username {values['username']!r} already exists")
+            else:
+                valid.append((line, values))
+        return valid
+
+    def insert(self, users: List[Tuple[int, AbstractBaseUser]]) -> None:
+        try:
+            with transaction.atomic():
+                if self.use_copy:
+                    copy_users([user for _, user in users])
+                else:
+                    UserModel.objects.bulk_create(user for _, user in users)
+        except IntegrityError:
+            # A concurrent insert won the race: fall back to one row at a time
+            for line, user in users:
+                try:
+                    with transaction.atomic():
+                        user.pk = None
+                        UserModel.objects.bulk_create([user])
+                except IntegrityError as error:
+                    self.error(line, str(error))
+                else:
+                    self.stats['created'] += 1
+        else:
+            self.stats['created'] += len(users)
+
+
+def rehash_passwords(batch_size: Optional[int] = None,
+                     executor: Optional[Executor] = None) -> Counter:
+    """Wrap the outdated PBKDF2 hashes in the preferred hasher, see WrappedPBKDF2PasswordHasher."""
+    batch_size = batch_size or settings.USER_BULK_BATCH_SIZE
+    stats: Counter = Counter()
+    last_pk = 0
+    while batch := list(
+            UserModel.objects.filter(pk__gt=last_pk, password__startswith='pbkdf2_sha256$')
+            .order_by('pk').values_list('pk', 'password')[:batch_size]):
+        last_pk = batch[-1][0]
+        outdated = [(pk, encoded) for pk, encoded in batch if needs_wrapping(encoded)]
+        stats['current'] += len(batch) - len(outdated)
+        if not outdated:
+            continue
+        encoded = [encoded for _, encoded in outdated]
+        wrapped = (map(WrappedPBKDF2PasswordHasher.wrap, encoded) if executor is None else
+                   executor.map(WrappedPBKDF2PasswordHasher.wrap, encoded,
+                                chunksize=HASH_CHUNK_SIZE))
+        now = timezone.now()
+        # Users who changed their password in the meantime are left alone
+        stats['upgraded'] += UserModel.objects.filter(
+            pk__in=[pk for pk, _ in outdated], password__in=encoded,
+        ).update(
+            password=Case(
+                *(When(pk=pk, password=old, then=Value(new))
+                  for (pk, old), new in zip(outdated, wrapped)),
+                default=F('password'),
+            ),
+            updated_at=now,
+        )
+        for pk, _ in outdated:
+            user_cache.invalidate(UserModel(pk=pk, updated_at=now))
+    return stats
+
+
+# Synthetic users written by `manage.py seed_users`
+FIRST_NAMES = ('Jake', 'Amy', 'Rosa', 'Charles', 'Terry', 'Gina', 'Raymond', 'Michael',
+               'Norm', 'Kevin', 'Doug', 'Adrian', 'Madeline', 'Sophia', 'Marcus', 'Teddy',
+               'Camille', 'Nikolaj', 'Karen', 'Jean-Pierre')
+LAST_NAMES = ('Peralta', 'Santiago', 'Diaz', 'Boyle', 'Jeffords', 'Linetti', 'Holt',
+              'Hitchcock', 'Scully', 'Cozner', 'Judy', 'Pimento', 'Wuntch', 'Perez',
+              'Wells', 'Kwazny', 'Bianchi', 'Martin', 'Dubois', 'Müller')
+SEED_DOMAINS = ('example.com', 'example.org', 'example.net')
+# Plain text password of every seeded user, hashed with a few salts only
+SEED_PASSWORD = 'seed1234'
+SEED_HASHES = 16
+SEED_ACTIVE_RATE = 0.9
+SEED_STAFF_RATE = 0.001
+
+
+# One local per generated column keeps the row readable
+def seed_rows(count: int, start: int, hashes: List[str],  # pylint: disable=too-many-locals
+              days: int, rng: random.Random) -> Iterator[dict]:
+    """
+    Field values of `count` users numbered from `start`, their emails and
+    usernames being unique by number. Half the inactive users registered
+    within VALIDATION_TOKEN_TTL, so their validation token is still valid.
+    """
+    now = timezone.now()
+    span = days * 86400
+    token_span = settings.VALIDATION_TOKEN_TTL.total_seconds()
+    languages = ['', *(code for code, _ in settings.LANGUAGES)]
+    for number in range(start, start + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        name = f"{first}.{last}".lower().replace('ü', 'u')
+        is_active = rng.random() < SEED_ACTIVE_RATE
+        is_staff = rng.random() < SEED_STAFF_RATE
+        pending = not is_active and rng.random() < 0.5
+        joined = now - timedelta(seconds=rng.random() * (token_span if pending else span))
+        last_login = None
+        if is_active and rng.random() < 0.8:
+            last_login = joined + (now - joined) * rng.random()
+        yield {
+            'password': rng.choice(hashes),
+            'last_login': last_login,
+            'is_superuser': is_staff and rng.random() < 0.1,
+            'username': f"{name.replace('.', '_')}{number}",
+            'first_name': first,
+            'last_name': last,
+            'is_staff': is_staff,
+            'is_active': is_active,
+            'date_joined': joined,
+            'email': f"{name}{number}@{rng.choice(SEED_DOMAINS)}",
+            'next_email': None,
+            'created_at': joined,
+            'updated_at': last_login or joined,
+            'language': rng.choice(languages),
+        }
+
+
+def adapt_rows(fields: list, rows: Iterable[dict]) -> List[list]:
+    """Column values of the rows, as COPY and executemany() skip the fields' adaptation."""
+    columns = [(field.attname, field.get_internal_type() == 'DateTimeField')
+               for field in fields]
+    adapt = connection.ops.adapt_datetimefield_value
+    return [[adapt(row[name]) if is_datetime else row[name] for name, is_datetime in columns]
+            for row in rows]
+
+
+# The keyword arguments are the options of the seed_users command
+def seed_users(count: int, *, batch_size: Optional[int] = None,  # pylint: disable=R0913
+               use_copy: Optional[bool] = None, days: int = 3 * 365, seed: Optional[int] = None,
+               password: str = SEED_PASSWORD) -> int:
+    """
+    Insert `count` synthetic users, reproducing production-scale tables. The
+    password is hashed SEED_HASHES times up front, the rows skip the model
+    instances and are inserted by batch, with COPY on PostgreSQL.
+    """
+    batch_size = batch_size or settings.USER_BULK_BATCH_SIZE
+    use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+    rng = random.Random(seed)
+    hashes = [make_password(password) for _ in range(SEED_HASHES)]
+    start = (UserModel.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+    fields = insert_fields()
+    for batch in batched(seed_rows(count, start, hashes, days, rng), batch_size):
+        with transaction.atomic():
+            (copy_rows if use_copy else insert_rows)(fields, adapt_rows(fields, batch))
+    # Query plans of the login and admin paths depend on the statistics
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {UserModel._meta.db_table}')  # pylint: disable=protected-access
+    return count
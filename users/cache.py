@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Optional
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from django_base.profiling import count
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class UserCache:
+    """
+    Users resolved by CustomBackend.get_user, stored as raw field values.
+
+    Each process keeps an LRU of (version, expiry, values) where the version
+    is the user's updated_at. When a shared cache is configured it holds the
+    current version of every user, so a save in any process invalidates the
+    local copies everywhere, and the values themselves keyed by version.
+
+    The password hash is left out, only the session auth hash derived from
+    it is stored: the password is loaded, deferred, by the few code paths
+    reading it.
+    """
+    key_prefix = 'users:cached_user'
+
+    def __init__(self):
+        self.local = LRUCache(getattr(settings, 'USER_CACHE_SIZE', 1024))
+        self.stats: Counter = Counter()
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'USER_CACHE_ALIAS', None)
+        return caches[alias] if alias else None
+
+    @property
+    def timeout(self) -> int:
+        return getattr(settings, 'USER_CACHE_TIMEOUT', 300)
+
+    def get(self, user_id):
+        user_id = self.normalize(user_id)
+        shared = self.shared
+        version = shared.get(self.version_key(user_id)) if shared else None
+        entry = self.local.get(user_id)
+        if entry and entry[1] > time.monotonic() and (
+                shared is None or entry[0] == version):
+            self.record('local_hit')
+            return self.build(entry[2])
+        if version is not None:
+            values = shared.get(self.values_key(user_id, version))
+            if values is not None:
+                self.record('shared_hit')
+                self.store_local(user_id, version, values)
+                return self.build(values)
+        self.record('miss')
+        return None
+
+    def record(self, event: str) -> None:
+        self.stats[event] += 1
+        count(f"user_cache.{event}")
+
+    def set(self, user) -> None:
+        version = self.version(user)
+        if version is None:
+            return
+        values = (*(getattr(user, name) for name in self.field_names()),
+                  user.get_session_auth_hash())
+        self.store_local(user.pk, version, values)
+        if shared := self.shared:
+            shared.add(self.version_key(user.pk), version, self.timeout)
+            shared.set(self.values_key(user.pk, version), values, self.timeout)
+
+    def invalidate(self, user) -> None:
+        self.local.delete(user.pk)
+        if shared := self.shared:
+            shared.set(self.version_key(user.pk), self.version(user), self.timeout)
+
+    def delete(self, user) -> None:
+        self.local.delete(user.pk)
+        if shared := self.shared:
+            shared.delete(self.version_key(user.pk))
+
+    def clear(self) -> None:
+        self.local.clear()
+        self.stats.clear()
+
+    def store_local(self, user_id, version, values) -> None:
+        self.local.set(user_id, (version, time.monotonic() + self.timeout, values))
+
+    def build(self, values: tuple):
+        UserModel = get_user_model()    # pylint: disable=invalid-name
+        *field_values, session_auth_hash = values
+        user = UserModel.from_db(router.db_for_read(UserModel),
+                                 self.field_names(), field_values)
+        user.cached_session_auth_hash = session_auth_hash
+        return user
+
+    def version_key(self, user_id) -> str:
+        return f"{self.key_prefix}:{user_id}:version"
+
+    def values_key(self, user_id, version: str) -> str:
+        return f"{self.key_prefix}:{user_id}:{version}"
+
+    @staticmethod
+    def version(user) -> Optional[str]:
+        return user.updated_at.isoformat() if user.updated_at else None
+
+    @staticmethod
+    def normalize(user_id):
+        return get_user_model()._meta.pk.to_python(user_id)
+
+    @staticmethod
+    def field_names() -> list:
+        return [field.attname for field in get_user_model()._meta.concrete_fields
+                if field.attname != 'password']
+
+
+user_cache = UserCache()
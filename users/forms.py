@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import get_user_model
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import translation
+from django.utils.translation import gettext_lazy as _
 from .mailer import UpdateEmailMailer
 
 UserModel = get_user_model()
@@ -12,34 +16,82 @@ class RegisterForm(UserCreationForm):
         model = UserModel
         fields = ('email', 'username', 'password1', 'password2')
 
-    def save(self, commit=True):
+    def clean_email(self):
+        email = self.cleaned_data['email']
+        if UserModel.email_taken(email):
+            raise ValidationError(
+                UserModel._meta.get_field('email').error_messages['unique'],
+                code='unique',
+            )
+        return email
+
+    def validate_unique(self):
+        # The email is already checked, case insensitively, by clean_email
+        exclude = self._get_validation_exclusions()
+        exclude.append('email')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as error:
+            self._update_errors(error)
+
+    def save(self, commit=True, send_email=True):
+        # The password is hashed once, by UserCreationForm.save()
         user = super().save(commit=False)
         user.is_active = False
-        user.set_password(self.cleaned_data["password1"])
-        user.save()
-        self.send_email(user)
+        # Emails are sent in the language the user registered in
+        user.language = translation.get_language() or ''
+        if commit:
+            try:
+                with transaction.atomic():
+                    user.save()
+                    if send_email:
+                        self.send_email(user)
+            except IntegrityError:
+                # Registered concurrently since clean(), the unique indexes
+                # caught it: the view shows the form again
+                self.add_unique_error(user)
+                raise
         return user
 
+    def add_unique_error(self, user) -> None:
+        field = 'email' if UserModel.email_taken(user.email) else 'username'
+        self.add_error(field, ValidationError(
+            UserModel._meta.get_field(field).error_messages['unique'], code='unique'))
+
     @staticmethod
     def send_email(user):
-        user.generate_validation_token()
-        user.send_email_activation_email()
+        # Queued in the user's transaction, or sent once the user is committed
+        if settings.EMAIL_QUEUE:
+            user.send_email_activation_email()
+        else:
+            transaction.on_commit(user.send_email_activation_email)
 
 
 class LoginForm(AuthenticationForm):
     username = forms.CharField(label='Email / Username')
+    error_messages = {
+        **AuthenticationForm.error_messages,
+        'throttled': _("Too many login attempts. Please try again later."),
+    }
+
+    def get_invalid_login_error(self):
+        if getattr(self.request, 'login_throttled', False):
+            return ValidationError(self.error_messages['throttled'], code='throttled')
+        return super().get_invalid_login_error()
 
 
 class UpdateEmailForm(forms.ModelForm):
     def clean_next_email(self):
         next_email = self.cleaned_data['next_email']
-        if UserModel.objects.filter(email=next_email).count() > 0:
+        if UserModel.email_taken(next_email):
             raise ValidationError("This email is already used")
         return next_email
 
-    def save(self, commit=True):
+    def save(self, commit=True, send_email=True):
         user = super(UpdateEmailForm, self).save()
-        UpdateEmailMailer(user).send()
+        if send_email:
+            UpdateEmailMailer(user).send()
+        return user
 
     class Meta:
         model = UserModel
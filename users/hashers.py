@@ -0,0 +1,154 @@
+"""
+Password hashers with their cost tuned by settings.PASSWORD_HASHER_COST,
+keyed by algorithm, e.g. {"scrypt": {"work_factor": 32768}}.
+
+The preferred hasher is picked by settings.PASSWORD_HASHER.
+"""
+import base64
+import hashlib
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.translation import gettext_noop as _
+
+
+class TunedHasherMixin:
+    def __init__(self):
+        super().__init__()
+        for name, value in settings.PASSWORD_HASHER_COST.get(self.algorithm, {}).items():
+            if not hasattr(self, name):
+                raise ImproperlyConfigured(f"{self.algorithm} has no {name} cost parameter")
+            setattr(self, name, value)
+
+
+class PBKDF2PasswordHasher(TunedHasherMixin, hashers.PBKDF2PasswordHasher):
+    pass
+
+
+class Argon2PasswordHasher(TunedHasherMixin, hashers.Argon2PasswordHasher):
+    pass
+
+
+class ScryptPasswordHasher(TunedHasherMixin, hashers.BasePasswordHasher):
+    """Memory hard hasher from the standard library, as added in Django 4.0."""
+    algorithm = 'scrypt'
+    work_factor = 2 ** 14
+    block_size = 8
+    parallelism = 1
+    dklen = 64
+
+    def encode(self, password, salt, work_factor=None, block_size=None, parallelism=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        work_factor = work_factor or self.work_factor
+        block_size = block_size or self.block_size
+        parallelism = parallelism or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=work_factor, r=block_size,
+            p=parallelism, dklen=self.dklen,
+            # scrypt needs 128 * n * r bytes, OpenSSL refuses more than 32MB by default
+            maxmem=256 * work_factor * block_size * parallelism,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return f"{self.algorithm}${work_factor}${salt}${block_size}${parallelism}${hash_}"
+
+    def decode(self, encoded) -> dict:
+        algorithm, work_factor, salt, block_size, parallelism, hash_ = encoded.split('$', 5)
+        assert algorithm == self.algorithm
+        return {'algorithm': algorithm, 'work_factor': int(work_factor), 'salt': salt,
+                'block_size': int(block_size), 'parallelism': int(parallelism),
+                'hash': hash_}
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(password, decoded['salt'], decoded['work_factor'],
+                                decoded['block_size'], decoded['parallelism'])
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            _('algorithm'): decoded['algorithm'],
+            _('work factor'): decoded['work_factor'],
+            _('block size'): decoded['block_size'],
+            _('parallelism'): decoded['parallelism'],
+            _('salt'): hashers.mask_hash(decoded['salt']),
+            _('hash'): hashers.mask_hash(decoded['hash']),
+        }
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return (decoded['work_factor'], decoded['block_size'], decoded['parallelism']) != (
+            self.work_factor, self.block_size, self.parallelism)
+
+    def harden_runtime(self, password, encoded):
+        # The runtime for the other parameters is too small to be worth hardening
+        pass
+
+
+class WrappedPBKDF2PasswordHasher(hashers.BasePasswordHasher):
+    """
+    PBKDF2 hash upgraded offline by `manage.py rehash_passwords`: the PBKDF2
+    hash itself is hashed by the preferred hasher, so the plain password is
+    not needed. The password is hashed again with the preferred hasher alone
+    on the next login.
+
+    The session auth hash of the PBKDF2 hash is kept alongside, so that the
+    upgrade does not sign the users out, see EmailUser.get_session_auth_hash.
+    """
+    algorithm = 'wrapped_pbkdf2_sha256'
+    inner = hashers.PBKDF2PasswordHasher()
+
+    @classmethod
+    def wrap(cls, encoded: str) -> str:
+        algorithm, iterations, salt, hash_ = encoded.split('$', 3)
+        assert algorithm == cls.inner.algorithm
+        outer = hashers.get_hasher()
+        return (f"{cls.algorithm}${iterations}${salt}${session_auth_hash(encoded)}$"
+                f"{outer.encode(hash_, outer.salt())}")
+
+    def encode(self, password, salt, iterations=None):
+        return self.wrap(self.inner.encode(password, salt, iterations))
+
+    def decode(self, encoded) -> dict:
+        algorithm, iterations, salt, session_hash, outer = encoded.split('$', 4)
+        assert algorithm == self.algorithm
+        return {'algorithm': algorithm, 'iterations': int(iterations), 'salt': salt,
+                'session_auth_hash': session_hash, 'outer': outer}
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        inner = self.inner.encode(password, decoded['salt'], decoded['iterations'])
+        outer = decoded['outer']
+        return hashers.identify_hasher(outer).verify(inner.split('$', 3)[3], outer)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            _('algorithm'): decoded['algorithm'],
+            _('iterations'): decoded['iterations'],
+            _('salt'): hashers.mask_hash(decoded['salt']),
+            _('hash'): hashers.mask_hash(decoded['outer']),
+        }
+
+    def must_update(self, encoded):
+        return True
+
+    def harden_runtime(self, password, encoded):
+        pass
+
+
+def session_auth_hash(encoded: str) -> str:
+    """AbstractBaseUser.get_session_auth_hash() of a user with this password hash."""
+    key_salt = "django.contrib.auth.models.AbstractBaseUser.get_session_auth_hash"
+    return salted_hmac(key_salt, encoded,
+                       algorithm=settings.DEFAULT_HASHING_ALGORITHM).hexdigest()
+
+
+def needs_wrapping(encoded: str) -> bool:
+    """Whether rehash_passwords should upgrade a hash."""
+    if not encoded.startswith(f"{WrappedPBKDF2PasswordHasher.inner.algorithm}$"):
+        return False
+    preferred = hashers.get_hasher()
+    return preferred.algorithm != 'pbkdf2_sha256' or preferred.must_update(encoded)
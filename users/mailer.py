@@ -1,49 +1,135 @@
+import threading
+from typing import Dict, Optional, Tuple
 from urllib.parse import urljoin
+from asgiref.sync import sync_to_async
+from django.apps import apps
 from django.shortcuts import reverse
 from django.conf import settings
-from django.utils.translation import gettext as _
-from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone, translation
+from django.utils.html import escape
+from django.utils.translation import gettext, gettext_lazy as _
+from django.template.loader import get_template
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django_base.profiling import count
+
+# Rendered in place of the per-message values, replaced after the lookup
+LINK_PLACEHOLDER = '__link_placeholder__'
+SUBJECT_PLACEHOLDER = '__subject_placeholder__'
+
+_rendered: Dict[Tuple[str, str], str] = {}
+_lock = threading.Lock()
+
+
+def render_template(template_name: str, language: str) -> str:
+    """
+    HTML body rendered once per template and language, with placeholders
+    for the link and subject. Rendered on every call when DEBUG is set, so
+    template changes show up.
+    """
+    key = (template_name, language)
+    if (html := _rendered.get(key)) is not None:
+        count('mail_template.hit')
+        return html
+    count('mail_template.miss')
+    with translation.override(language):
+        html = get_template(template_name).render({
+            'link': LINK_PLACEHOLDER,
+            'subject': SUBJECT_PLACEHOLDER,
+            'SITE_TITLE': settings.SITE_TITLE,
+        })
+    if not settings.DEBUG:
+        with _lock:
+            _rendered[key] = html
+    return html
+
+
+def clear_rendered() -> None:
+    with _lock:
+        _rendered.clear()
 
 
 class UserMailer:
+    """
+    Email to a user, translated in the user's language: the subject and
+    body are lazy strings, evaluated when the message is built.
+    """
     from_email = None
-    subject = _(f"Message from {settings.SITE_TITLE}")
+    subject = _("Message from {site_title}")
     template = ""
 
     def __init__(self, user):
         self.user = user
 
     def send(self) -> None:
-        msg = EmailMultiAlternatives(
-            subject=self.subject,
-            body=self.message(),
-            from_email=self.from_email,
-            to=[self.user.email],
-        )
-        msg.attach_alternative(self.html_message(), "text/html")
-        msg.send()
-
-    def message(self):
+        msg = self.build_message()
+        if settings.EMAIL_QUEUE:
+            apps.get_model('users', 'OutboundEmail').enqueue(msg)
+        else:
+            msg.send()
+
+    async def asend(self) -> None:
+        """send() for async views: the SMTP exchange doesn't hold the sync thread."""
+        if settings.EMAIL_QUEUE:
+            await sync_to_async(self.send)()
+            return
+        msg = await sync_to_async(self.build_message)()
+        await sync_to_async(msg.send, thread_sensitive=False)()
+
+    @classmethod
+    def send_bulk(cls, queryset, chunk_size: Optional[int] = None) -> int:
+        """
+        Send the email to every user of the queryset, bypassing the outbox.
+        Messages share one rendered body per language and one mail connection.
+        """
+        chunk_size = chunk_size or settings.EMAIL_BULK_CHUNK_SIZE
+        sent = 0
+        with get_connection() as connection:
+            chunk = []
+            for user in queryset.iterator(chunk_size=chunk_size):
+                chunk.append(cls(user).build_message())
+                if len(chunk) == chunk_size:
+                    sent += connection.send_messages(chunk) or 0
+                    chunk = []
+            if chunk:
+                sent += connection.send_messages(chunk) or 0
+        return sent
+
+    @property
+    def language(self) -> str:
+        return self.user.language or settings.LANGUAGE_CODE
+
+    def build_message(self) -> EmailMultiAlternatives:
+        with translation.override(self.language):
+            subject = self.subject.format(site_title=settings.SITE_TITLE)
+            link = self.email_link()
+            msg = EmailMultiAlternatives(
+                subject=subject,
+                body=self.message(link),
+                from_email=self.from_email,
+                to=[self.user.email],
+            )
+            msg.attach_alternative(self.html_message(subject, link), "text/html")
+        return msg
+
+    def message(self, link: str) -> str:
         raise NotImplementedError
 
-    def html_message(self) -> str:
-        return render_to_string(self.template, self.get_context())
-
-    def get_context(self) -> dict:
-        return {'link': self.email_link(), 'subject': self.subject}
+    def html_message(self, subject: str, link: str) -> str:
+        html = render_template(self.template, self.language)
+        return html.replace(SUBJECT_PLACEHOLDER, escape(subject)).replace(
+            LINK_PLACEHOLDER, escape(link))
 
     def email_link(self) -> str:    # pylint: disable=no-self-use
         return ""
 
 
 class UpdateEmailMailer(UserMailer):
-    subject = _(f'Confirm your new email for {settings.SITE_TITLE}')
+    subject = _("Confirm your new email for {site_title}")
     template = "users/email/update_email.html"
 
-    def message(self):
-        return _(f"To confirm your new email please copy the following link "
-                 f"in your browser : {self.email_link()}")
+    def message(self, link: str) -> str:
+        return gettext("To confirm your new email please copy the following link "
+                       "in your browser: {link}").format(link=link)
 
     def email_link(self) -> str:
         url = reverse('validate_new_email',
@@ -54,14 +140,23 @@ class UpdateEmailMailer(UserMailer):
 
 
 class ValidateAccountMailer(UserMailer):
-    subject = _('Email address validation')
+    subject = _("Email address validation")
     template = "users/email/validate_account.html"
 
-    def message(self):
-        return _(f"To confirm your account please copy the following link "
-                 f"in your browser {self.email_link()}:")
+    def message(self, link: str) -> str:
+        return gettext("To confirm your account please copy the following link "
+                       "in your browser: {link}").format(link=link)
 
     def email_link(self) -> str:
         url = reverse('validate_email',
                       kwargs={'validation_token': self.user.validation_token})
         return urljoin(settings.BASE_URL, url)
+
+
+class ValidationReminderMailer(ValidateAccountMailer):
+    """Validation email sent again later, with a link valid from now on."""
+
+    def email_link(self) -> str:
+        token = self.user.generate_validation_token(issued_at=timezone.now())
+        url = reverse('validate_email', kwargs={'validation_token': token})
+        return urljoin(settings.BASE_URL, url)
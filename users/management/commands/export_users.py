@@ -0,0 +1,26 @@
+from contextlib import ExitStack
+from django.core.management.base import BaseCommand
+from users.bulk import FORMATS, export_rows, guess_format, write_rows
+
+
+class Command(BaseCommand):
+    help = "Export the users, with their password hashes, to a CSV or JSON lines file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help="Destination file, the standard output by default")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Defaults to jsonl for .jsonl files, csv otherwise")
+        parser.add_argument('--batch-size', type=int,
+                            help="Rows fetched from the database at once")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        with ExitStack() as stack:
+            if path == '-':
+                file = self.stdout
+            else:
+                file = stack.enter_context(open(path, 'w', newline='', encoding='utf-8'))
+            written = write_rows(file, fmt, export_rows(options['batch_size']))
+        self.stderr.write(f"{written} users exported")
@@ -0,0 +1,46 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from django.core.management.base import BaseCommand
+from users.bulk import FORMATS, UserImporter, guess_format, read_rows, setup_worker
+
+
+class Command(BaseCommand):
+    help = "Import users from a CSV or JSON lines file, as written by export_users"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, - for the standard input")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Defaults to jsonl for .jsonl files, csv otherwise")
+        parser.add_argument('--batch-size', type=int,
+                            help="Rows validated, hashed and inserted at once")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help="Processes hashing the plain text passwords, 0 to hash inline")
+        parser.add_argument('--no-copy', action='store_true',
+                            help="Insert with INSERT instead of COPY on PostgreSQL")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        with ExitStack() as stack:
+            if path == '-':
+                file = sys.stdin
+            else:
+                file = stack.enter_context(open(path, newline='', encoding='utf-8'))
+            executor = None
+            if options['workers']:
+                executor = stack.enter_context(ProcessPoolExecutor(
+                    options['workers'], initializer=setup_worker
+                ))
+            importer = UserImporter(
+                batch_size=options['batch_size'],
+                executor=executor,
+                use_copy=False if options['no_copy'] else None,
+                on_error=self.report_error,
+            )
+            stats = importer.run(read_rows(file, fmt))
+        self.stdout.write(f"{stats['created']} users created, {stats['skipped']} skipped")
+
+    def report_error(self, line: int, message: str) -> None:
+        self.stderr.write(f"row {line}: {message}")
@@ -0,0 +1,28 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+from users.bulk import rehash_passwords, setup_worker
+
+
+class Command(BaseCommand):
+    help = ("Upgrade the outdated PBKDF2 password hashes to the preferred hasher "
+            "without waiting for the users to log in")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help="Hashes upgraded in one query")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help="Processes computing the hashes, 0 to hash inline")
+
+    def handle(self, *args, **options):
+        with ExitStack() as stack:
+            executor = None
+            if options['workers']:
+                executor = stack.enter_context(ProcessPoolExecutor(
+                    options['workers'], initializer=setup_worker
+                ))
+            stats = rehash_passwords(options['batch_size'], executor)
+        self.stdout.write(f"{stats['upgraded']} hashes wrapped in {get_hasher().algorithm}, "
+                          f"{stats['current']} already current")
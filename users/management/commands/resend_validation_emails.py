@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from users.mailer import ValidationReminderMailer
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Send the account validation email again to inactive users"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int,
+                            help="Messages handed to the mail connection at once")
+
+    def handle(self, *args, **options):
+        users = UserModel.objects.filter(is_active=False).order_by('pk')
+        sent = ValidationReminderMailer.send_bulk(users, options['chunk_size'])
+        self.stdout.write(f"{sent} emails sent")
@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from users.bulk import SEED_PASSWORD, seed_users
+
+
+class Command(BaseCommand):
+    help = ("Insert synthetic users, to reproduce the query plans of a production-scale "
+            f"table locally. Their password is {SEED_PASSWORD!r} unless --password is given")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, required=True, help="Users to create")
+        parser.add_argument('--batch-size', type=int, help="Rows inserted at once")
+        parser.add_argument('--days', type=int, default=3 * 365,
+                            help="Registration dates spread over this many past days")
+        parser.add_argument('--seed', type=int,
+                            help="Seed of the random generator, for reproducible data")
+        parser.add_argument('--password', default=SEED_PASSWORD,
+                            help="Plain text password of the users")
+        parser.add_argument('--no-copy', action='store_true',
+                            help="Insert with INSERT instead of COPY on PostgreSQL")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        created = seed_users(
+            options['count'],
+            batch_size=options['batch_size'],
+            use_copy=False if options['no_copy'] else None,
+            days=options['days'],
+            seed=options['seed'],
+            password=options['password'],
+        )
+        self.stdout.write(f"{created} users created in {time.perf_counter() - start:.1f}s")
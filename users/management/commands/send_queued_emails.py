@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from users.outbox import drain
+
+
+class Command(BaseCommand):
+    help = "Send the emails waiting in the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help="Emails sent over one mail connection")
+        parser.add_argument('--max-attempts', type=int,
+                            help="Attempts before an email is dead-lettered")
+        parser.add_argument('--backoff', type=int,
+                            help="Seconds before the first retry, doubled on each attempt")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling the outbox instead of exiting when empty")
+        parser.add_argument('--interval', type=float, default=5,
+                            help="Seconds to wait when the outbox is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            results = drain(options['batch_size'], options['max_attempts'],
+                            options['backoff'])
+            if results:
+                self.stdout.write(', '.join(
+                    f"{count} {status}" for status, count in sorted(results.items())
+                ))
+            elif not options['loop']:
+                return
+            else:
+                time.sleep(options['interval'])
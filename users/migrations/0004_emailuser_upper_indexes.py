@@ -0,0 +1,25 @@
+# Functional indexes backing the case-insensitive login lookup.
+# Django 3.1 cannot declare expression indexes in Meta.indexes, hence RunSQL.
+# The syntax is shared by PostgreSQL and SQLite.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_emailuser_next_email'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX users_emailuser_username_upper '
+                'ON users_emailuser (UPPER(username));',
+            reverse_sql='DROP INDEX users_emailuser_username_upper;',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX users_emailuser_email_upper '
+                'ON users_emailuser (UPPER(email));',
+            reverse_sql='DROP INDEX users_emailuser_email_upper;',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.1.6 on 2026-10-18 19:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_outboundemail'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='emailuser',
+            name='validation_token',
+        ),
+        # SQLite rebuilds the table to drop a column, which loses the
+        # expression indexes created by 0004.
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS users_emailuser_username_upper '
+                'ON users_emailuser (UPPER(username));',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS users_emailuser_email_upper '
+                'ON users_emailuser (UPPER(email));',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.1.6 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+UPPER_INDEXES = (
+    ('users_emailuser_username_upper', 'username'),
+    ('users_emailuser_email_upper', 'email'),
+)
+
+
+def pattern_upper_indexes(apps, schema_editor):
+    # Outside the C locale, PostgreSQL only uses an index for the admin's
+    # prefix search (UPPER(email) LIKE 'X%') with text_pattern_ops, which
+    # also serves the equality of the login lookup.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in UPPER_INDEXES:
+        schema_editor.execute(f'DROP INDEX {name};')
+        schema_editor.execute(
+            f'CREATE INDEX {name} ON users_emailuser (UPPER({column}) text_pattern_ops);'
+        )
+
+
+def plain_upper_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in UPPER_INDEXES:
+        schema_editor.execute(f'DROP INDEX {name};')
+        schema_editor.execute(f'CREATE INDEX {name} ON users_emailuser (UPPER({column}));')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_remove_emailuser_validation_token'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailuser',
+            index=models.Index(fields=['created_at', 'id'], name='users_user_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='emailuser',
+            index=models.Index(condition=models.Q(is_staff=True), fields=['created_at', 'id'], name='users_user_staff_created'),
+        ),
+        migrations.AddIndex(
+            model_name='emailuser',
+            index=models.Index(condition=models.Q(is_superuser=True), fields=['created_at', 'id'], name='users_user_super_created'),
+        ),
+        migrations.RunPython(pattern_upper_indexes, plain_upper_indexes),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.1.6 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_emailuser_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailuser',
+            name='language',
+            field=models.CharField(blank=True, choices=[('en', 'English'), ('fr', 'Français')], default='', max_length=10, verbose_name='language'),
+        ),
+        # SQLite rebuilds the table to add a column, which loses the
+        # expression indexes created by 0004.
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS users_emailuser_username_upper '
+                'ON users_emailuser (UPPER(username));',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS users_emailuser_email_upper '
+                'ON users_emailuser (UPPER(email));',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
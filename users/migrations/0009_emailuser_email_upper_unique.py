@@ -0,0 +1,58 @@
+# Case-insensitive uniqueness of the emails, enforced by the database:
+# clean_email() alone lets two concurrent registrations of A@x.com and
+# a@x.com through. Replaces the UPPER(email) index of 0004, rebuilt with
+# text_pattern_ops on PostgreSQL by 0007.
+# Migrations rebuilding the table on SQLite must recreate this index.
+
+from django.db import IntegrityError, migrations, models
+from django.db.models.functions import Upper
+
+
+def check_duplicate_emails(apps, schema_editor):
+    # Fail before touching the indexes, listing the users to merge or fix
+    # instead of the bare error of CREATE UNIQUE INDEX.
+    EmailUser = apps.get_model('users', 'EmailUser')
+    users = EmailUser.objects.using(schema_editor.connection.alias).annotate(
+        email_upper=Upper('email'))
+    duplicates = users.values('email_upper').annotate(
+        count=models.Count('pk')).filter(count__gt=1).values('email_upper')
+    conflicts = users.filter(email_upper__in=duplicates).order_by('email_upper', 'pk')
+    if conflicts:
+        rows = '\n'.join(f'  {user.pk}: {user.email}' for user in conflicts)
+        raise IntegrityError(f'Emails differing only by case, fix them before migrating:\n{rows}')
+
+
+def upper_email(connection):
+    # Same operator class as 0007: the index also backs the admin's prefix
+    # search on PostgreSQL.
+    if connection.vendor == 'postgresql':
+        return 'UPPER(email) text_pattern_ops'
+    return 'UPPER(email)'
+
+
+def unique_upper_index(apps, schema_editor):
+    schema_editor.execute(
+        'CREATE UNIQUE INDEX users_emailuser_email_upper_uniq '
+        f'ON users_emailuser ({upper_email(schema_editor.connection)});'
+    )
+    schema_editor.execute('DROP INDEX users_emailuser_email_upper;')
+
+
+def plain_upper_index(apps, schema_editor):
+    schema_editor.execute(
+        'CREATE INDEX users_emailuser_email_upper '
+        f'ON users_emailuser ({upper_email(schema_editor.connection)});'
+    )
+    schema_editor.execute('DROP INDEX users_emailuser_email_upper_uniq;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_emailuser_language'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunPython(unique_upper_index, plain_upper_index),
+    ]
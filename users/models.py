@@ -1,12 +1,78 @@
-import jwt
+from datetime import datetime, timedelta
+from typing import List, Optional
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from django.db import models
-from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Upper
+from .auth_token import ACTIVATION, EMAIL_CHANGE, make_token
+from .cache import user_cache
+from .hashers import WrappedPBKDF2PasswordHasher
 from .mailer import ValidateAccountMailer
 
+# Stands for the values of the fields deferred when the instance was loaded
+_UNTRACKED = object()
+
+
+class DirtyFieldsMixin(models.Model):
+    """
+    Track the field values loaded from or saved to the database: save() on
+    a tracked instance writes the changed columns only, and nothing when no
+    field changed. The auto_now fields, e.g. updated_at, are written along
+    with the changed ones, but not added to an explicit update_fields, as
+    with any Django model.
+    """
+    _saved_values: Optional[dict] = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.track()
+        return instance
+
+    def track(self, field_names=None) -> None:
+        fields = (self._meta.concrete_fields if field_names is None else
+                  [self._meta.get_field(name) for name in field_names])
+        saved = dict(self._saved_values or {})
+        for field in fields:
+            if field.attname in self.__dict__:
+                saved[field.attname] = self.__dict__[field.attname]
+        self._saved_values = saved
+
+    def changed_fields(self) -> Optional[List[str]]:
+        """Names of the fields changed since tracked, None when not tracked."""
+        if self._saved_values is None or self._state.adding:
+            return None
+        return [field.name for field in self._meta.concrete_fields
+                if field.attname in self.__dict__ and
+                self._saved_values.get(field.attname, _UNTRACKED) != self.__dict__[field.attname]]
+
+    def save(self, *args, **kwargs):
+        if not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            changed = self.changed_fields()
+            if changed == []:
+                return
+            if changed is not None:
+                kwargs['update_fields'] = [*changed, *self.auto_now_fields(changed)]
+        super().save(*args, **kwargs)
+        self.track(kwargs.get('update_fields'))
+
+    def auto_now_fields(self, update_fields) -> List[str]:
+        return [field.name for field in self._meta.concrete_fields
+                if getattr(field, 'auto_now', False) and field.name not in update_fields]
 
-class DatedModel(models.Model):
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        self.track(fields)
+
+
+class DatedModel(DirtyFieldsMixin, models.Model):
     created_at = models.DateTimeField(
         verbose_name=_("created at"),
         auto_now_add=True
@@ -21,7 +87,7 @@ class DatedModel(models.Model):
         ordering = ["-created_at"]
 
 
-class EmailUser(AbstractUser):
+class EmailUser(DirtyFieldsMixin, AbstractUser):
     email = models.EmailField(
         _('email address'),
         blank=False,
@@ -44,37 +110,194 @@ class EmailUser(AbstractUser):
         verbose_name=_("updated at"),
         auto_now=True
     )
-    validation_token = models.CharField(
-        verbose_name=_('validation token'),
-        max_length=255,
-        null=True, blank=True,
+    # Language of the emails, settings.LANGUAGE_CODE when blank
+    language = models.CharField(
+        verbose_name=_("language"),
+        max_length=10,
+        choices=settings.LANGUAGES,
+        blank=True,
+        default='',
     )
 
-    def generate_validation_token(self):
-        self.validation_token = jwt.encode(
-            {"user_id": self.id, "user_email": self.email},
-            settings.SECRET_KEY, algorithm="HS256"
-        )
-        self.save()
+    # Set by users.cache.UserCache.build()
+    cached_session_auth_hash: Optional[str] = None
+
+    class Meta(AbstractUser.Meta):
+        # Back the keyset pagination of the admin, staff and superusers being
+        # few, their list filters get small partial indexes.
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='users_user_created_id'),
+            models.Index(fields=['created_at', 'id'], name='users_user_staff_created',
+                         condition=models.Q(is_staff=True)),
+            models.Index(fields=['created_at', 'id'], name='users_user_super_created',
+                         condition=models.Q(is_superuser=True)),
+        ]
+
+    def save(self, *args, **kwargs):
+        # updated_at versions the cached users: unlike other models it is
+        # written by explicit update_fields too, e.g. update_last_login() or
+        # the password upgraded on login. It is left as is when no field
+        # changed and nothing was written.
+        if update_fields := kwargs.get('update_fields'):
+            kwargs['update_fields'] = [*update_fields, *self.auto_now_fields(update_fields)]
+        updated_at = self.updated_at
+        super().save(*args, **kwargs)
+        if self.updated_at != updated_at:
+            user_cache.invalidate(self)
+
+    def get_session_auth_hash(self):
+        # Users built by the user cache don't hold their password hash
+        if self.cached_session_auth_hash and 'password' in self.get_deferred_fields():
+            return self.cached_session_auth_hash
+        # Sessions survive the offline upgrade of the hash by rehash_passwords
+        if self.password and self.password.startswith(f"{WrappedPBKDF2PasswordHasher.algorithm}$"):
+            return WrappedPBKDF2PasswordHasher().decode(self.password)['session_auth_hash']
+        return super().get_session_auth_hash()
+
+    def delete(self, *args, **kwargs):
+        user_cache.delete(self)
+        return super().delete(*args, **kwargs)
+
+    @property
+    def validation_token(self) -> Optional[str]:
+        if self.is_active or self.pk is None:
+            return None
+        return self.generate_validation_token()
+
+    def generate_validation_token(self, issued_at: Optional[datetime] = None) -> str:
+        # Tokens are not stored: they are signed and expire, by default
+        # VALIDATION_TOKEN_TTL after the registration.
+        return make_token(ACTIVATION, issued_at or self.created_at,
+                          user_id=self.id, user_email=self.email)
+
+    @classmethod
+    def activate(cls, user_id: int, email: str) -> bool:
+        now = timezone.now()
+        activated = cls.objects.filter(
+            id=user_id, email=email, is_active=False
+        ).update(is_active=True, updated_at=now)
+        if activated:
+            user_cache.invalidate(cls(pk=user_id, updated_at=now))
+        return bool(activated)
 
     def send_email_activation_email(self) -> None:
         mailer = ValidateAccountMailer(self)
         mailer.send()
 
     def new_email_validation_token(self) -> str:
-        return jwt.encode(
-            {"user_id": self.id, "user_email": self.email,
-             "next_email": self.next_email},
-            settings.SECRET_KEY, algorithm="HS256"
-        )
+        return make_token(EMAIL_CHANGE, timezone.now(), user_id=self.id,
+                          user_email=self.email, next_email=self.next_email)
 
     def validate(self):
         self.is_active = True
-        self.validation_token = None
         self.save()
 
     def replace_email(self):
-        self.email = self.next_email
+        email_field = self._meta.get_field('email')
+        email = email_field.clean(self.next_email, self)
+        if self.email_taken(email, exclude_pk=self.pk):
+            raise ValidationError({'email': email_field.error_messages['unique']})
+        self.email = email
         self.next_email = None
-        self.full_clean()
-        self.save()
+        try:
+            with transaction.atomic():
+                self.save(update_fields=['email', 'next_email'])
+        except IntegrityError as error:
+            # Taken in the meantime, see migration 0009
+            raise ValidationError({'email': email_field.error_messages['unique']}) from error
+
+    @classmethod
+    def email_taken(cls, email: str, exclude_pk: Optional[int] = None) -> bool:
+        """Case insensitive check, backed by the UPPER(email) index."""
+        users = cls.objects.annotate(email_upper=Upper('email')).filter(
+            email_upper=Upper(models.Value(email, output_field=models.CharField()))
+        )
+        if exclude_pk is not None:
+            users = users.exclude(pk=exclude_pk)
+        return users.exists()
+
+
+class OutboundEmail(DatedModel):
+    PENDING = 'pending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = (
+        (PENDING, _('pending')),
+        (SENT, _('sent')),
+        (DEAD, _('dead')),
+    )
+
+    subject = models.CharField(verbose_name=_('subject'), max_length=255)
+    body = models.TextField(verbose_name=_('body'))
+    html_body = models.TextField(verbose_name=_('html body'), blank=True)
+    from_email = models.CharField(verbose_name=_('from'), max_length=254)
+    to = models.EmailField(verbose_name=_('to'))
+    status = models.CharField(
+        verbose_name=_('status'),
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name=_('attempts'),
+        default=0
+    )
+    next_attempt_at = models.DateTimeField(
+        verbose_name=_('next attempt at'),
+        default=timezone.now
+    )
+    last_error = models.TextField(verbose_name=_('last error'), blank=True)
+    sent_at = models.DateTimeField(
+        verbose_name=_('sent at'),
+        null=True, blank=True,
+    )
+
+    class Meta(DatedModel.Meta):
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='users_outbox_pending',
+                         condition=models.Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f"{self.to}: {self.subject}"
+
+    @classmethod
+    def enqueue(cls, message: EmailMultiAlternatives) -> 'OutboundEmail':
+        html_bodies = [content for content, mimetype in message.alternatives
+                       if mimetype == 'text/html']
+        return cls.objects.create(
+            subject=message.subject,
+            body=message.body,
+            html_body=html_bodies[0] if html_bodies else '',
+            from_email=message.from_email,
+            to=message.to[0],
+        )
+
+    def to_message(self, connection=None) -> EmailMultiAlternatives:
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=[self.to],
+            connection=connection,
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, "text/html")
+        return message
+
+    def mark_sent(self) -> None:
+        self.status = self.SENT
+        self.attempts += 1
+        self.sent_at = timezone.now()
+        self.save(update_fields=['status', 'attempts', 'sent_at', 'updated_at'])
+
+    def mark_failed(self, error: Exception, max_attempts: int, backoff: int) -> None:
+        self.attempts += 1
+        self.last_error = repr(error)
+        if self.attempts >= max_attempts:
+            self.status = self.DEAD
+        else:
+            delay = backoff * 2 ** (self.attempts - 1)
+            self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        self.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at',
+                                 'updated_at'])
@@ -0,0 +1,69 @@
+from collections import Counter
+from datetime import timedelta
+from typing import List, Optional
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+from .models import OutboundEmail
+
+
+def drain(batch_size: Optional[int] = None, max_attempts: Optional[int] = None,
+          backoff: Optional[int] = None) -> Counter:
+    """
+    Send one batch of due emails over a single mail connection.
+
+    The batch is claimed in a short transaction, pushing its next attempt
+    EMAIL_QUEUE_LEASE seconds later, so no row lock is held while talking
+    to the mail server and the emails of a crashed worker are sent again.
+    """
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_QUEUE_MAX_ATTEMPTS
+    backoff = backoff or settings.EMAIL_QUEUE_BACKOFF
+    results: Counter = Counter()
+    emails = claim(batch_size)
+    if not emails:
+        return results
+
+    def failed(email: OutboundEmail, error: Exception) -> None:
+        email.mark_failed(error, max_attempts, backoff)
+        results['dead' if email.status == OutboundEmail.DEAD else 'retried'] += 1
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:  # pylint: disable=broad-except
+        for email in emails:
+            failed(email, error)
+        return results
+    try:
+        for email in emails:
+            try:
+                connection.send_messages([email.to_message(connection)])
+            except Exception as error:  # pylint: disable=broad-except
+                failed(email, error)
+            else:
+                email.mark_sent()
+                results['sent'] += 1
+    finally:
+        connection.close()
+    return results
+
+
+def claim(batch_size: int) -> List[OutboundEmail]:
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if emails:
+            leased_until = now + timedelta(seconds=settings.EMAIL_QUEUE_LEASE)
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                next_attempt_at=leased_until, updated_at=now)
+            for email in emails:
+                email.next_attempt_at = leased_until
+                email.track(['next_attempt_at'])
+    return emails
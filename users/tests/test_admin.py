@@ -0,0 +1,103 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from users.admin import decode_cursor, encode_cursor
+
+UserModel = get_user_model()
+
+
+class UserAdminTest(TestCase):
+    url = reverse('admin:users_emailuser_changelist')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserModel.objects.create_superuser(
+            email='raymond.holt@b99.com', username='holt', password='iamtheboss'
+        )
+        now = timezone.now()
+        UserModel.objects.bulk_create(
+            UserModel(email=f"user{i}@b99.com", username=f"user{i}", is_staff=i % 10 == 0)
+            for i in range(250)
+        )
+        # Two users per timestamp, ordered by id within it
+        for index, user in enumerate(UserModel.objects.exclude(pk=cls.admin.pk).order_by('pk')):
+            UserModel.objects.filter(pk=user.pk).update(
+                created_at=now - timedelta(minutes=index // 2))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def expected(self, queryset=None):
+        queryset = queryset if queryset is not None else UserModel.objects.all()
+        return list(queryset.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def get(self, query_string: str):
+        # Pagination links are relative query strings
+        return self.client.get(f"{self.url}{query_string}")
+
+    def browse(self, query_string: str = '') -> list:
+        pages = []
+        while query_string is not None:
+            response = self.get(query_string)
+            self.assertEqual(200, response.status_code)
+            changelist = response.context['cl']
+            pages.append([user.pk for user in changelist.result_list])
+            query_string = changelist.next_url
+        return pages
+
+    def test_keyset_pages(self):
+        pages = self.browse()
+        self.assertEqual([100, 100, 51], [len(page) for page in pages])
+        self.assertEqual(self.expected(), sum(pages, []))
+
+    def test_previous_pages(self):
+        response = self.get('')
+        self.assertIsNone(response.context['cl'].previous_url)
+        second = self.get(response.context['cl'].next_url)
+        third = self.get(second.context['cl'].next_url)
+        self.assertIsNone(third.context['cl'].next_url)
+        back = self.get(third.context['cl'].previous_url)
+        self.assertEqual(second.context['cl'].result_list, back.context['cl'].result_list)
+        first = self.get(back.context['cl'].previous_url)
+        self.assertEqual(response.context['cl'].result_list, first.context['cl'].result_list)
+        self.assertIsNone(first.context['cl'].previous_url)
+        self.assertContains(back, 'Next')
+        self.assertContains(back, '251 users')
+
+    def test_filters_and_search(self):
+        pages = self.browse("?is_staff__exact=1")
+        self.assertEqual(self.expected(UserModel.objects.filter(is_staff=True)), sum(pages, []))
+        response = self.get("?q=USER24")
+        self.assertEqual({'user24', 'user240', 'user241', 'user242', 'user243', 'user244',
+                          'user245', 'user246', 'user247', 'user248', 'user249'},
+                         {user.username for user in response.context['cl'].result_list})
+
+    def test_filter_after_paging(self):
+        response = self.get(self.get('').context['cl'].next_url)
+        self.assertIsNotNone(response.context['cl'].first_url)
+        # Filtering or searching the second page starts over from the first one
+        self.assertContains(response, 'href="?is_staff__exact=1"')
+        self.assertNotContains(response, 'name="cursor"')
+        pages = self.browse("?is_staff__exact=1")
+        self.assertEqual(self.expected(UserModel.objects.filter(is_staff=True)), sum(pages, []))
+
+    def test_no_offset_query(self):
+        response = self.get('')
+        with CaptureQueriesContext(connection) as queries:
+            self.get(response.context['cl'].next_url)
+        for query in queries:
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_invalid_cursor(self):
+        response = self.get("?cursor=garbage")
+        # The admin redirects to the unfiltered list on invalid lookups
+        self.assertEqual(302, response.status_code)
+
+    def test_cursor(self):
+        created_at = timezone.now()
+        self.assertEqual(('next', created_at, 12),
+                         decode_cursor(encode_cursor('next', created_at, 12)))
@@ -0,0 +1,159 @@
+"""The async views served by the ASGI handler, through AsyncClient."""
+import asyncio
+import time
+from unittest import skipUnless
+from urllib.parse import urlencode
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.shortcuts import reverse
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import resolve
+from django_base.test_helpers import BENCHMARK
+from .test_data import create_inactive_user, create_user_jake
+
+UserModel = get_user_model()
+
+SLOW_EMAIL_BACKEND = 'users.tests.test_async_views.SlowEmailBackend'
+
+
+def post(client: AsyncClient, url: str, data: dict):
+    # The test payload of Django 3.1 can't be parsed as multipart by ASGIRequest
+    return client.post(url, urlencode(data), content_type='application/x-www-form-urlencoded')
+
+
+class SlowEmailBackend(locmem.EmailBackend):
+    """A remote SMTP server, taking `delay` seconds per message."""
+    delay = 0.05
+
+    def send_messages(self, messages):
+        time.sleep(self.delay * len(messages))
+        return super().send_messages(messages)
+
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        self.user = create_user_jake()
+        self.async_client = AsyncClient()
+        self.async_client.force_login(self.user)
+
+    def test_urlconfs(self):
+        # WSGI requests don't pay for an event loop
+        self.assertFalse(asyncio.iscoroutinefunction(resolve(reverse('profile')).func))
+        for name in ('profile', 'register', 'update_email'):
+            view = resolve(reverse(name), urlconf=settings.ASYNC_URLCONF).func
+            self.assertTrue(asyncio.iscoroutinefunction(view), name)
+        # The other views are shared
+        self.assertEqual(resolve(reverse('login')).func.view_class,
+                         resolve(reverse('login'), urlconf=settings.ASYNC_URLCONF).func.view_class)
+
+    async def test_profile(self):
+        response = await self.async_client.get(reverse('profile'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('users/profile.html', response.template_name[0])
+        self.assertContains(response, 'baracuda')
+
+    async def test_profile_anonymous(self):
+        response = await AsyncClient().get(reverse('profile'))
+        self.assertEqual(302, response.status_code)
+        self.assertEqual(f"{settings.LOGIN_URL}?next={reverse('profile')}", response.url)
+
+    async def test_method_not_allowed(self):
+        response = await self.async_client.put(reverse('profile'))
+        self.assertEqual(405, response.status_code)
+
+    async def test_update_email_anonymous(self):
+        response = await post(AsyncClient(), reverse('update_email'),
+                              {'next_email': 'jackie_baracuda@b99.com'})
+        self.assertEqual(302, response.status_code)
+        self.assertEqual(f"{settings.LOGIN_URL}?next={reverse('update_email')}", response.url)
+        self.assertEqual([], mail.outbox)
+
+    async def test_register_page(self):
+        response = await AsyncClient().get(reverse('register'))
+        self.assertEqual(200, response.status_code)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    async def test_email_validation(self):
+        user = await sync_to_async(create_inactive_user)()
+        url = reverse('validate_email', kwargs={'validation_token': user.validation_token})
+        response = await AsyncClient().get(url)
+        self.assertTemplateUsed(response, 'users/email_confirmed.html')
+        await sync_to_async(user.refresh_from_db)()
+        self.assertTrue(user.is_active)
+
+    async def test_new_email_validation(self):
+        self.user.next_email = 'jackie_baracuda@b99.com'
+        await sync_to_async(self.user.save)()
+        token = self.user.new_email_validation_token()
+        response = await self.async_client.get(
+            reverse('validate_new_email', kwargs={'validation_token': token}))
+        self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+        await sync_to_async(self.user.refresh_from_db)()
+        self.assertEqual('jackie_baracuda@b99.com', self.user.email)
+
+    @override_settings(EMAIL_QUEUE=False, EMAIL_BACKEND=SLOW_EMAIL_BACKEND)
+    async def test_register_sends_email(self):
+        response = await post(AsyncClient(), reverse('register'), {
+            'email': 'rosa.diaz@b99.com', 'username': 'Rosa',
+            'password1': 'badass101', 'password2': 'badass101',
+        })
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        user = await sync_to_async(UserModel.objects.get)(email='rosa.diaz@b99.com')
+        self.assertEqual(['rosa.diaz@b99.com'], mail.outbox[0].to)
+        self.assertIn(user.validation_token, mail.outbox[0].body)
+
+    @override_settings(EMAIL_QUEUE=False, EMAIL_BACKEND=SLOW_EMAIL_BACKEND)
+    async def test_update_email_sends_email(self):
+        response = await post(self.async_client, reverse('update_email'),
+                              {'next_email': 'jackie_baracuda@b99.com'})
+        self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+        self.assertEqual(['jake.peralta@b99.com'], mail.outbox[0].to)
+
+    async def test_update_email_invalid(self):
+        response = await post(self.async_client, reverse('update_email'),
+                              {'next_email': self.user.email})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([], mail.outbox)
+
+
+@skipUnless(BENCHMARK, 'set BENCHMARK=1 to run benchmarks')
+@override_settings(EMAIL_QUEUE=False, EMAIL_BACKEND=SLOW_EMAIL_BACKEND)
+class ConcurrencyBenchmark(TestCase):
+    """Email changes sent to a slow SMTP server by one worker, WSGI or ASGI."""
+    requests = 40
+
+    def setUp(self):
+        self.user = create_user_jake()
+        self.client.force_login(self.user)
+        self.async_client = AsyncClient()
+        self.async_client.force_login(self.user)
+
+    def data(self, index: int) -> dict:
+        return {'next_email': f'jake.{index}@b99.com'}
+
+    def report(self, name: str, elapsed: float) -> None:
+        self.assertEqual(self.requests, len(mail.outbox))
+        mail.outbox.clear()
+        print(f"\n{name}: {self.requests} requests, {self.requests / elapsed:.1f} requests/s")
+
+    async def post_concurrently(self):
+        responses = await asyncio.gather(*(
+            post(self.async_client, reverse('update_email'), self.data(index))
+            for index in range(self.requests)
+        ))
+        self.assertEqual({302}, {response.status_code for response in responses})
+
+    def test_update_email(self):
+        start = time.perf_counter()
+        for index in range(self.requests):
+            self.assertEqual(302, self.client.post(reverse('update_email'),
+                                                   self.data(index)).status_code)
+        self.report('WSGI, sync worker', time.perf_counter() - start)
+
+        start = time.perf_counter()
+        # The database work runs in this thread, inside the test transaction
+        async_to_sync(self.post_concurrently)()
+        self.report('ASGI, one event loop', time.perf_counter() - start)
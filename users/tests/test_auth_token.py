@@ -0,0 +1,76 @@
+from unittest import mock
+import jwt
+from django.shortcuts import reverse
+from django.test import TestCase
+from users import auth_token
+from users.auth_token import (
+    ACTIVATION, EMAIL_CHANGE, clear_token_caches, decode_token, token_stats
+)
+from .test_data import create_inactive_user, create_user_jake
+
+
+class TokenCacheTest(TestCase):
+    def setUp(self):
+        clear_token_caches()
+        self.user = create_inactive_user()
+        self.token = self.user.validation_token
+
+    def test_verified_token_cached(self):
+        self.assertEqual(self.user.pk, decode_token(self.token, ACTIVATION)['user_id'])
+        with mock.patch.object(jwt, 'decode') as decode:
+            self.assertEqual(self.user.pk, decode_token(self.token, ACTIVATION)['user_id'])
+        decode.assert_not_called()
+        self.assertEqual({'miss': 1, 'hit': 1}, token_stats)
+
+    def test_purpose_checked_on_cache_hit(self):
+        decode_token(self.token, ACTIVATION)
+        self.assertIsNone(decode_token(self.token, EMAIL_CHANGE))
+
+    def test_expired_token_not_served_from_cache(self):
+        decode_token(self.token, ACTIVATION)
+        with mock.patch.object(auth_token.time, 'time', return_value=2 ** 40), \
+                mock.patch.object(jwt, 'decode', side_effect=jwt.ExpiredSignatureError):
+            self.assertIsNone(decode_token(self.token, ACTIVATION))
+        self.assertEqual({'miss': 2}, token_stats)
+
+    def test_invalid_signature_negative_cache(self):
+        header, payload, _ = self.token.split('.')
+        forged = f"{header}.{payload}.{'A' * 43}"
+        self.assertIsNone(decode_token(forged, ACTIVATION))
+        with mock.patch.object(jwt, 'decode') as decode:
+            self.assertIsNone(decode_token(forged, ACTIVATION))
+        decode.assert_not_called()
+        self.assertEqual({'miss': 1, 'rejected_hit': 1}, token_stats)
+
+    def test_malformed_tokens(self):
+        header, payload, signature = self.token.split('.')
+        malformed = [
+            '1234',
+            f"{header}.{payload}",
+            f"{header}.{payload}.{signature}A",
+            f"eyJhbGciOiJub25lIn0.{payload}.{signature}",
+            f"{header}.{payload}!.{signature}",
+            f"{header}.{'a' * 2000}.{signature}",
+        ]
+        with mock.patch.object(jwt, 'decode') as decode:
+            for token in malformed:
+                self.assertIsNone(decode_token(token, ACTIVATION))
+        decode.assert_not_called()
+        self.assertEqual({'malformed': len(malformed)}, token_stats)
+
+    def test_bot_flood_without_queries(self):
+        url = reverse('validate_email', kwargs={'validation_token': '1234'})
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                self.client.get(url)
+
+    def test_unknown_user_token_rejected(self):
+        user = create_user_jake()
+        user.next_email = 'jackie_baracuda@b99.com'
+        token = user.new_email_validation_token()
+        user.delete()
+        url = reverse('validate_new_email', kwargs={'validation_token': token})
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.assertEqual(1, token_stats['rejected_hit'])
@@ -0,0 +1,34 @@
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from users.backends import CustomBackend, login_queryset
+from .test_data import create_user_jake
+
+
+class LoginLookupTest(TestCase):
+    def setUp(self):
+        self.user = create_user_jake()
+
+    def test_lookup_by_username_ignores_case(self):
+        self.assertEqual(self.user, login_queryset('BaRaCuDa').first())
+
+    def test_lookup_by_email_ignores_case(self):
+        self.assertEqual(self.user, login_queryset('Jake.Peralta@B99.com').first())
+
+    def test_lookup_unknown_user(self):
+        self.assertIsNone(login_queryset('holt').first())
+
+    def test_authenticate_single_query(self):
+        with self.assertNumQueries(1):
+            user = CustomBackend().authenticate(None, 'JAKE.peralta@b99.com', 'rosa1234')
+        self.assertEqual(self.user, user)
+
+    def test_authenticate_wrong_password(self):
+        self.assertIsNone(CustomBackend().authenticate(None, 'baracuda', 'invalid'))
+
+    @skipUnless(connection.vendor == 'sqlite',
+                'PostgreSQL prefers a sequential scan on a near empty table')
+    def test_lookup_uses_upper_indexes(self):
+        plan = login_queryset('baracuda').explain()
+        self.assertIn('users_emailuser_username_upper', plan)
+        self.assertIn('users_emailuser_email_upper_uniq', plan)
@@ -0,0 +1,130 @@
+"""
+Benchmarks are skipped by default as they load large datasets.
+Run them with: BENCHMARK=1 ./manage.py test users.tests.test_benchmarks
+"""
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from unittest import skipUnless
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django_base.test_helpers import BENCHMARK, report
+from users.backends import login_queryset
+from users.bulk import seed_users, setup_worker
+from users.forms import RegisterForm
+
+UserModel = get_user_model()
+
+BENCHMARK_USERS = int(os.environ.get('BENCHMARK_USERS', 1_000_000))
+
+
+@skipUnless(BENCHMARK, 'set BENCHMARK=1 to run benchmarks')
+class LoginBenchmark(TestCase):
+    runs = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        start = time.perf_counter()
+        seed_users(BENCHMARK_USERS, seed=0)
+        print(f"\n{BENCHMARK_USERS} users seeded in {time.perf_counter() - start:.1f}s")
+
+    def test_login_lookup(self):
+        username, email = UserModel.objects.values_list('username', 'email').last()
+        for identifier in (username.upper(), email.title(), "unknown"):
+            timings = []
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(self.runs):
+                    start = time.perf_counter()
+                    login_queryset(identifier).first()
+                    timings.append(time.perf_counter() - start)
+            self.assertEqual(self.runs, len(queries))
+            report(f"login lookup {identifier!r} among {BENCHMARK_USERS} users", timings)
+
+
+HASHERS = {
+    'pbkdf2_sha256': 'users.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'users.hashers.ScryptPasswordHasher',
+    'argon2': 'users.hashers.Argon2PasswordHasher',
+}
+# Hasher settings compared by HasherBenchmark: (algorithm, cost)
+HASHER_SETTINGS = [
+    ('pbkdf2_sha256', {}),
+    ('pbkdf2_sha256', {'iterations': 390_000}),
+    ('scrypt', {}),
+    ('scrypt', {'work_factor': 2 ** 15}),
+    ('argon2', {}),
+]
+
+
+def check_rosa(encoded: str) -> bool:
+    return check_password('rosa1234', encoded)
+
+
+@skipUnless(BENCHMARK, 'set BENCHMARK=1 to run benchmarks')
+class HasherBenchmark(TestCase):
+    """Logins per second and per core for each hasher setting, to size the login fleet."""
+    runs = 20
+
+    def test_hashers(self):
+        workers = os.cpu_count()
+        for algorithm, cost in HASHER_SETTINGS:
+            hashers = [HASHERS[algorithm], *HASHERS.values()]
+            with self.subTest(algorithm=algorithm, cost=cost), override_settings(
+                    PASSWORD_HASHERS=hashers, PASSWORD_HASHER_COST={algorithm: cost}):
+                try:
+                    encoded = make_password('rosa1234')
+                except ValueError as error:
+                    self.skipTest(str(error))
+                timings = []
+                for _ in range(self.runs):
+                    start = time.perf_counter()
+                    check_rosa(encoded)
+                    timings.append(time.perf_counter() - start)
+                name = f"{algorithm} {cost or 'default cost'}"
+                report(f"check_password {name}", timings)
+                print(f"{1 / statistics.median(timings):.1f} logins/s per core")
+
+                # Hashes release the GIL but a process pool avoids any contention
+                with ProcessPoolExecutor(workers, initializer=setup_worker) as executor:
+                    list(executor.map(check_rosa, [encoded] * workers))
+                    start = time.perf_counter()
+                    list(executor.map(check_rosa, [encoded] * self.runs * workers))
+                    elapsed = time.perf_counter() - start
+                print(f"{self.runs * workers / elapsed:.1f} logins/s on {workers} cores")
+
+
+class DoubleHashRegisterForm(RegisterForm):
+    """The registration before the password was hashed once, for comparison."""
+
+    def save(self, commit=True, send_email=True):
+        user = super().save(commit=False)
+        user.set_password(self.cleaned_data['password1'])
+        user.save()
+        if send_email:
+            user.send_email_activation_email()
+        return user
+
+
+@skipUnless(BENCHMARK, 'set BENCHMARK=1 to run benchmarks')
+@override_settings(EMAIL_QUEUE=True)
+class SignupBenchmark(TestCase):
+    """Signups per second and per core, the email being queued."""
+    runs = 50
+
+    def test_signup(self):
+        for name, form_class in (('double hash', DoubleHashRegisterForm),
+                                 ('single hash', RegisterForm)):
+            timings = []
+            for i in range(self.runs):
+                form = form_class({'email': f"{name[0]}{i}@b99.com", 'username': f"{name[0]}{i}",
+                                   'password1': 'badass101', 'password2': 'badass101'})
+                start = time.perf_counter()
+                self.assertTrue(form.is_valid())
+                form.save()
+                timings.append(time.perf_counter() - start)
+            report(f"signup {name}", timings)
+            print(f"{1 / statistics.median(timings):.1f} signups/s per core")
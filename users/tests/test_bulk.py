@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from users.bulk import UserImporter
+from .test_data import create_user_jake
+
+UserModel = get_user_model()
+
+CSV = """email,username,first_name,last_name,is_active,password
+rosa.diaz@B99.com,rosa,Rosa,Diaz,true,motorcycle
+charles.boyle@b99.com,charles,Charles,Boyle,false,
+not an email,gina,Gina,Linetti,,
+JAKE.PERALTA@b99.com,jake,Jake,Peralta,,
+terry.jeffords@b99.com,Baracuda,Terry,Jeffords,,
+rosa.diaz@b99.com,rosa2,Rosa,Diaz,,
+hitchcock@b99.com,hitch cock,Michael,Hitchcock,,
+"""
+
+
+class ImportUsersTest(TestCase):
+    def setUp(self):
+        create_user_jake()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name: str, content: str) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def import_users(self, *args) -> tuple:
+        out, err = StringIO(), StringIO()
+        call_command('import_users', *args, '--workers=0', stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        out, err = self.import_users(self.write('users.csv', CSV))
+        self.assertIn('2 users created, 5 skipped', out)
+        self.assertIn("row 3: invalid email 'not an email'", err)
+        self.assertIn("row 4: email 'JAKE.PERALTA@b99.com' already exists", err)
+        self.assertIn("row 5: username 'Baracuda' already exists", err)
+        self.assertIn("row 6: duplicate email 'rosa.diaz@b99.com'", err)
+        self.assertIn("row 7: invalid username 'hitch cock'", err)
+
+        rosa = UserModel.objects.get(username='rosa')
+        self.assertEqual('rosa.diaz@b99.com', rosa.email)
+        self.assertTrue(rosa.is_active)
+        self.assertTrue(rosa.check_password('motorcycle'))
+        charles = UserModel.objects.get(username='charles')
+        self.assertFalse(charles.is_active)
+        self.assertFalse(charles.has_usable_password())
+
+    def test_import_jsonl(self):
+        password = make_password('nine-nine')
+        rows = [
+            {'email': 'rosa.diaz@b99.com', 'username': 'rosa', 'is_staff': True,
+             'password_hash': password, 'date_joined': '2013-09-17T20:00:00+00:00'},
+            {'email': 'charles.boyle@b99.com', 'username': 'charles'},
+        ]
+        path = self.write('users.jsonl', ''.join(f"{json.dumps(row)}\n" for row in rows))
+        out, _ = self.import_users(path)
+        self.assertIn('2 users created, 0 skipped', out)
+        rosa = UserModel.objects.get(username='rosa')
+        self.assertEqual(password, rosa.password)
+        self.assertTrue(rosa.is_staff)
+        self.assertEqual(2013, rosa.date_joined.year)
+
+    def test_queries_per_batch(self):
+        rows = [{'email': f"user{i}@b99.com", 'username': f"user{i}",
+                 'password_hash': 'unusable'} for i in range(50)]
+        with CaptureQueriesContext(connection) as queries:
+            stats = UserImporter(batch_size=25).run(rows)
+        self.assertEqual(50, stats['created'])
+        # Two duplicate checks and one insert per batch
+        self.assertLessEqual(len(queries), 2 * 3 + 4)
+
+    def test_duplicate_across_batches(self):
+        rows = [{'email': 'rosa.diaz@b99.com', 'username': 'rosa'},
+                {'email': 'ROSA.DIAZ@b99.com', 'username': 'rosa2'}]
+        errors = []
+        stats = UserImporter(batch_size=1, on_error=lambda *error: errors.append(error)).run(rows)
+        self.assertEqual({'created': 1, 'skipped': 1}, dict(stats))
+        self.assertEqual([(2, "email 'ROSA.DIAZ@b99.com' already exists")], errors)
+
+    def test_process_pool(self):
+        path = self.write('users.csv', CSV)
+        call_command('import_users', path, '--workers=2', stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(UserModel.objects.get(username='rosa').check_password('motorcycle'))
+
+
+class ExportUsersTest(TestCase):
+    def test_round_trip(self):
+        jake = create_user_jake()
+        for fmt in ('csv', 'jsonl'):
+            with self.subTest(fmt):
+                out = StringIO()
+                call_command('export_users', f'--format={fmt}', stdout=out, stderr=StringIO())
+                exported = out.getvalue()
+                self.assertIn('jake.peralta@b99.com', exported)
+                self.assertIn(jake.password, exported)
+
+                jake.delete()
+                directory = tempfile.mkdtemp()
+                self.addCleanup(shutil.rmtree, directory)
+                path = os.path.join(directory, f"users.{fmt}")
+                with open(path, 'w', encoding='utf-8') as file:
+                    file.write(exported)
+                call_command('import_users', path, '--workers=0',
+                             stdout=StringIO(), stderr=StringIO())
+                jake = UserModel.objects.get(username='baracuda')
+                self.assertTrue(jake.check_password('rosa1234'))
+                self.assertEqual('Peralta', jake.last_name)
+
+
+class SeedUsersTest(TestCase):
+    def seed(self, *args) -> str:
+        out = StringIO()
+        call_command('seed_users', *args, stdout=out)
+        return out.getvalue()
+
+    def test_seed(self):
+        create_user_jake()
+        self.assertIn("300 users created", self.seed('--count=300', '--batch-size=100', '--seed=1'))
+        users = UserModel.objects.exclude(username='baracuda')
+        self.assertEqual(300, users.count())
+        self.assertEqual(300, len(set(users.values_list('email', flat=True))))
+        self.assertEqual(300, len(set(users.values_list('username', flat=True))))
+        self.assertTrue(users.filter(is_active=False).exists())
+        self.assertTrue(users.filter(is_active=True).exists())
+        self.assertGreater(len(set(users.values_list('date_joined', flat=True))), 1)
+
+    def test_users_valid(self):
+        self.seed('--count=20', '--seed=1', '--password=motorcycle')
+        for user in UserModel.objects.all():
+            user.full_clean(exclude=['password'])
+            self.assertEqual(user.created_at, user.date_joined)
+            self.assertGreaterEqual(user.updated_at, user.created_at)
+            self.assertTrue(user.check_password('motorcycle'))
+            if not user.is_active:
+                self.assertIsNotNone(user.validation_token)
+
+    def test_seed_again(self):
+        self.seed('--count=10', '--seed=1')
+        self.seed('--count=10', '--seed=1')
+        self.assertEqual(20, len(set(UserModel.objects.values_list('email', flat=True))))
+
+    def test_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.seed('--count=25', '--batch-size=10', '--no-copy')
+        inserts = [query for query in queries if 'INSERT INTO' in query['sql']]
+        self.assertEqual(3, len(inserts))
@@ -0,0 +1,112 @@
+from django.core.cache import caches
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django_base.test_helpers import LOCMEM_CACHES
+from users.backends import CustomBackend
+from users.cache import LRUCache, user_cache
+from .test_data import create_user_jake, create_inactive_user
+
+
+class LRUCacheTest(TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+        self.assertEqual(2, len(cache))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UserCacheTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        user_cache.clear()
+        self.user = create_user_jake()
+
+    def test_get_user_hit_and_miss(self):
+        backend = CustomBackend()
+        self.assertEqual(self.user, backend.get_user(self.user.pk))
+        with self.assertNumQueries(0):
+            user = backend.get_user(str(self.user.pk))
+        self.assertEqual('baracuda', user.username)
+        self.assertEqual({'miss': 1, 'local_hit': 1}, user_cache.stats)
+
+    def test_shared_hit_in_cold_process(self):
+        CustomBackend().get_user(self.user.pk)
+        user_cache.local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user, CustomBackend().get_user(self.user.pk))
+        self.assertEqual(1, user_cache.stats['shared_hit'])
+
+    def test_invalidated_on_save(self):
+        CustomBackend().get_user(self.user.pk)
+        self.user.first_name = 'Jacob'
+        self.user.save()
+        self.assertEqual('Jacob', CustomBackend().get_user(self.user.pk).first_name)
+        self.assertEqual(2, user_cache.stats['miss'])
+
+    def test_invalidated_on_password_change(self):
+        CustomBackend().get_user(self.user.pk)
+        self.user.set_password('nouveau1234')
+        self.user.save()
+        self.assertTrue(CustomBackend().get_user(self.user.pk).check_password('nouveau1234'))
+
+    def test_partial_save_invalidates_other_processes(self):
+        CustomBackend().get_user(self.user.pk)
+        entry = user_cache.local.get(self.user.pk)
+        self.user.set_password('nouveau1234')
+        self.user.save(update_fields=['password'])
+        # Local copy kept by another process
+        user_cache.local.set(self.user.pk, entry)
+        self.assertTrue(CustomBackend().get_user(self.user.pk).check_password('nouveau1234'))
+
+    def test_password_not_cached(self):
+        CustomBackend().get_user(self.user.pk)
+        version = user_cache.version(self.user)
+        values = caches['default'].get(user_cache.values_key(self.user.pk, version))
+        self.assertNotIn(self.user.password, values)
+        user_cache.local.clear()
+        user = CustomBackend().get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user.get_session_auth_hash(), user.get_session_auth_hash())
+        # Loaded when needed
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('rosa1234'))
+
+    def test_invalidated_on_validate(self):
+        user = create_inactive_user()
+        CustomBackend().get_user(user.pk)
+        user.validate()
+        self.assertTrue(CustomBackend().get_user(user.pk).is_active)
+
+    def test_invalidated_on_delete(self):
+        user_id = self.user.pk
+        CustomBackend().get_user(user_id)
+        self.user.delete()
+        self.assertIsNone(CustomBackend().get_user(user_id))
+
+    @override_settings(USER_CACHE_ALIAS=None)
+    def test_local_only_cache(self):
+        CustomBackend().get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            CustomBackend().get_user(self.user.pk)
+        self.user.last_name = 'Peralta-Santiago'
+        self.user.save()
+        self.assertEqual('Peralta-Santiago',
+                         CustomBackend().get_user(self.user.pk).last_name)
+
+    def test_profile_page_warm_cache(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('profile'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(200, response.status_code)
+        user_queries = [q['sql'] for q in queries if 'users_emailuser' in q['sql']]
+        self.assertEqual([], user_queries)
+        self.assertEqual(1, user_cache.stats['local_hit'])
@@ -0,0 +1,124 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError, transaction
+from django.test import TestCase, override_settings
+from users.forms import RegisterForm, UpdateEmailForm
+from users.models import OutboundEmail
+from .test_data import create_user_amy, create_user_jake
+
+UserModel = get_user_model()
+
+
+class EmailUniquenessTest(TestCase):
+    def setUp(self):
+        self.user = create_user_jake()
+
+    def register_form(self, email: str) -> RegisterForm:
+        return RegisterForm({'email': email, 'username': 'Rosa',
+                             'password1': 'badass101', 'password2': 'badass101'})
+
+    def test_register_email_taken_ignores_case(self):
+        form = self.register_form('JAKE.Peralta@b99.com')
+        self.assertFalse(form.is_valid())
+        self.assertEqual(['A user with that email already exists.'], form.errors['email'])
+
+    def test_register_queries(self):
+        form = self.register_form('rosa.diaz@b99.com')
+        # One existence check for the email, one unique check for the username
+        with self.assertNumQueries(2):
+            self.assertTrue(form.is_valid())
+
+    def test_update_email_taken_ignores_case(self):
+        create_user_amy()
+        form = UpdateEmailForm({'next_email': 'Amy.Santiago@B99.com'}, instance=self.user)
+        with self.assertNumQueries(1):
+            self.assertFalse(form.is_valid())
+        self.assertEqual(['This email is already used'], form.errors['next_email'])
+
+    def test_replace_email_queries(self):
+        self.user.next_email = 'jackie_baracuda@b99.com'
+        # Existence check and update, in a savepoint within the test transaction
+        with self.assertNumQueries(4):
+            self.user.replace_email()
+        self.user.refresh_from_db()
+        self.assertEqual('jackie_baracuda@b99.com', self.user.email)
+        self.assertIsNone(self.user.next_email)
+
+    def test_replace_email_taken_ignores_case(self):
+        create_user_amy()
+        self.user.next_email = 'AMY.santiago@b99.com'
+        with self.assertRaisesMessage(ValidationError, 'A user with that email already exists.'):
+            self.user.replace_email()
+        self.user.refresh_from_db()
+        self.assertEqual('jake.peralta@b99.com', self.user.email)
+
+    def test_replace_email_taken_concurrently(self):
+        create_user_amy()
+        self.user.next_email = 'AMY.santiago@b99.com'
+        with mock.patch.object(UserModel, 'email_taken', return_value=False), \
+                self.assertRaisesMessage(ValidationError, 'A user with that email already exists.'):
+            self.user.replace_email()
+        self.user.refresh_from_db()
+        self.assertEqual('jake.peralta@b99.com', self.user.email)
+
+    def test_replace_email_invalid(self):
+        self.user.next_email = 'not an email'
+        with self.assertRaises(ValidationError):
+            self.user.replace_email()
+
+
+class RegisterTest(TestCase):
+    def setUp(self):
+        self.form = RegisterForm({'email': 'rosa.diaz@b99.com', 'username': 'Rosa',
+                                  'password1': 'badass101', 'password2': 'badass101'})
+        self.assertTrue(self.form.is_valid())
+
+    def test_password_hashed_once(self):
+        with mock.patch('django.contrib.auth.base_user.make_password',
+                        wraps=make_password) as hash_password:
+            user = self.form.save()
+        hash_password.assert_called_once_with('badass101')
+        self.assertTrue(user.check_password('badass101'))
+        self.assertFalse(user.is_active)
+
+    @override_settings(EMAIL_QUEUE=True)
+    def test_user_and_email_inserted_together(self):
+        # Savepoint, user, outbox email and release
+        with self.assertNumQueries(4):
+            user = self.form.save()
+        self.assertEqual([user.email], [email.to for email in OutboundEmail.objects.all()])
+
+    @override_settings(EMAIL_QUEUE=True)
+    def test_user_rolled_back_with_email(self):
+        with mock.patch.object(OutboundEmail, 'enqueue', side_effect=DatabaseError), \
+                self.assertRaises(DatabaseError):
+            self.form.save()
+        self.assertFalse(UserModel.objects.filter(username='Rosa').exists())
+
+    @override_settings(EMAIL_QUEUE=False)
+    def test_email_sent_on_commit(self):
+        with mock.patch('users.forms.transaction.on_commit') as on_commit:
+            user = self.form.save()
+        self.assertEqual(mail.outbox, [])
+        on_commit.assert_called_once_with(user.send_email_activation_email)
+
+    def test_email_unique_ignoring_case(self):
+        create_user_jake()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserModel.objects.create(username='jake', email='Jake.Peralta@B99.com')
+
+    def test_concurrent_registration(self):
+        # Registered by another request since the form was cleaned
+        UserModel.objects.create(username='rosa2', email='ROSA.DIAZ@b99.com')
+        with self.assertRaises(IntegrityError):
+            self.form.save()
+        self.assertEqual(['A user with that email already exists.'], self.form.errors['email'])
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_no_commit(self):
+        user = self.form.save(commit=False)
+        self.assertIsNone(user.pk)
+        self.assertFalse(OutboundEmail.objects.exists())
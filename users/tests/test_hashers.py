@@ -0,0 +1,108 @@
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from users.hashers import ScryptPasswordHasher, WrappedPBKDF2PasswordHasher
+from .test_data import create_user_amy, create_user_jake
+
+UserModel = get_user_model()
+
+PBKDF2 = 'users.hashers.PBKDF2PasswordHasher'
+SCRYPT = 'users.hashers.ScryptPasswordHasher'
+WRAPPED = 'users.hashers.WrappedPBKDF2PasswordHasher'
+# Low costs keep the tests fast
+COST = {'pbkdf2_sha256': {'iterations': 1000}, 'scrypt': {'work_factor': 2 ** 10}}
+SCRYPT_PREFERRED = override_settings(PASSWORD_HASHERS=[SCRYPT, PBKDF2, WRAPPED],
+                                     PASSWORD_HASHER_COST=COST)
+
+
+class ScryptPasswordHasherTest(TestCase):
+    @SCRYPT_PREFERRED
+    def test_make_password(self):
+        encoded = make_password('rosa1234')
+        self.assertTrue(encoded.startswith('scrypt$1024$'))
+        self.assertTrue(check_password('rosa1234', encoded))
+        self.assertFalse(check_password('rosa12345', encoded))
+        self.assertIn('work factor', identify_hasher(encoded).safe_summary(encoded))
+
+    @SCRYPT_PREFERRED
+    def test_must_update(self):
+        encoded = make_password('rosa1234')
+        self.assertFalse(identify_hasher(encoded).must_update(encoded))
+        with override_settings(PASSWORD_HASHER_COST={}):
+            self.assertTrue(ScryptPasswordHasher().must_update(encoded))
+
+    @override_settings(PASSWORD_HASHERS=[SCRYPT, PBKDF2, WRAPPED],
+                       PASSWORD_HASHER_COST={'scrypt': {'rounds': 2}})
+    def test_unknown_cost(self):
+        with self.assertRaisesMessage(Exception, 'scrypt has no rounds cost parameter'):
+            make_password('rosa1234')
+
+
+class RehashPasswordsTest(TestCase):
+    @override_settings(PASSWORD_HASHERS=[PBKDF2, SCRYPT, WRAPPED], PASSWORD_HASHER_COST=COST)
+    def setUp(self):
+        self.jake = create_user_jake()
+        self.amy = create_user_amy()
+
+    def rehash(self) -> str:
+        out = StringIO()
+        call_command('rehash_passwords', '--workers=0', '--batch-size=1', stdout=out)
+        return out.getvalue()
+
+    @SCRYPT_PREFERRED
+    def test_rehash(self):
+        self.assertIn('2 hashes wrapped in scrypt, 0 already current', self.rehash())
+        self.jake.refresh_from_db()
+        self.assertTrue(self.jake.password.startswith('wrapped_pbkdf2_sha256$1000$'))
+        self.assertIn('$scrypt$1024$', self.jake.password)
+        self.assertIn('0 hashes wrapped in scrypt', self.rehash())
+
+        # The wrapped hash is replaced by a plain scrypt one on login
+        self.assertEqual(self.jake, authenticate(username='baracuda', password='rosa1234'))
+        self.jake.refresh_from_db()
+        self.assertTrue(self.jake.password.startswith('scrypt$1024$'))
+        self.assertIsNone(authenticate(username='Aby', password='rosa1234'))
+        self.assertEqual(self.amy, authenticate(username='Aby', password='philatelie'))
+
+    @SCRYPT_PREFERRED
+    def test_sessions_kept(self):
+        self.client.force_login(self.jake)
+        session_hash = self.jake.get_session_auth_hash()
+        self.rehash()
+        self.jake.refresh_from_db()
+        self.assertEqual(session_hash, self.jake.get_session_auth_hash())
+        self.assertEqual(200, self.client.get(reverse('profile')).status_code)
+
+        # Changing the password still signs the other sessions out
+        self.jake.set_password('nine-nine')
+        self.jake.save()
+        self.assertEqual(302, self.client.get(reverse('profile')).status_code)
+
+    @override_settings(PASSWORD_HASHERS=[PBKDF2, SCRYPT, WRAPPED],
+                       PASSWORD_HASHER_COST={'pbkdf2_sha256': {'iterations': 2000}})
+    def test_rehash_iterations(self):
+        self.assertIn('2 hashes wrapped in pbkdf2_sha256, 0 already current', self.rehash())
+        self.amy.refresh_from_db()
+        self.assertTrue(self.amy.password.startswith('wrapped_pbkdf2_sha256$1000$'))
+        self.assertTrue(self.amy.check_password('philatelie'))
+
+    @override_settings(PASSWORD_HASHERS=[PBKDF2, SCRYPT, WRAPPED], PASSWORD_HASHER_COST=COST)
+    def test_current_hashes(self):
+        self.assertIn('0 hashes wrapped in pbkdf2_sha256, 2 already current', self.rehash())
+
+    @SCRYPT_PREFERRED
+    def test_password_changed_meanwhile(self):
+        wrap = WrappedPBKDF2PasswordHasher.wrap
+
+        def change_password(encoded):
+            UserModel.objects.filter(pk=self.jake.pk).update(password=make_password('nine-nine'))
+            return wrap(encoded)
+
+        with mock.patch.object(WrappedPBKDF2PasswordHasher, 'wrap', side_effect=change_password):
+            self.assertIn('1 hashes wrapped in scrypt', self.rehash())
+        self.jake.refresh_from_db()
+        self.assertTrue(self.jake.check_password('nine-nine'))
@@ -0,0 +1,122 @@
+import time
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import translation
+from django_base.test_helpers import BENCHMARK, report
+from users import mailer
+from users.mailer import UpdateEmailMailer, ValidateAccountMailer
+from users.models import OutboundEmail
+from .test_data import create_inactive_user, create_user_jake
+
+UserModel = get_user_model()
+
+
+class SendBulkTest(TestCase):
+    def setUp(self):
+        create_user_jake()
+        create_inactive_user()
+        for index in range(4):
+            user = UserModel.objects.create_user(
+                email=f"cadet{index}@b99.com", username=f"cadet{index}",
+                password='1234', is_active=False
+            )
+            user.generate_validation_token()
+        self.inactive_users = UserModel.objects.filter(is_active=False).order_by('pk')
+        mailer.clear_rendered()
+
+    def test_send_bulk(self):
+        self.assertEqual(5, ValidateAccountMailer.send_bulk(self.inactive_users))
+        self.assertEqual(5, len(mail.outbox))
+        self.assertFalse(OutboundEmail.objects.exists())
+        for message, user in zip(mail.outbox, self.inactive_users):
+            self.assertEqual([user.email], message.to)
+            self.assertIn(user.validation_token, message.body)
+            self.assertIn(user.validation_token, message.alternatives[0][0])
+
+    def test_single_template_and_connection(self):
+        with mock.patch.object(mailer, 'get_template',
+                               wraps=mailer.get_template) as get_template, \
+                mock.patch.object(mailer, 'get_connection',
+                                  wraps=mailer.get_connection) as get_connection:
+            ValidateAccountMailer.send_bulk(self.inactive_users)
+        get_template.assert_called_once_with(ValidateAccountMailer.template)
+        get_connection.assert_called_once()
+
+    def test_chunks(self):
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=len) as send_messages:
+            self.assertEqual(5, ValidateAccountMailer.send_bulk(self.inactive_users,
+                                                                chunk_size=2))
+        self.assertEqual([2, 2, 1], [len(call.args[0])
+                                     for call in send_messages.call_args_list])
+
+    def test_resend_validation_emails_command(self):
+        call_command('resend_validation_emails', stdout=mock.Mock())
+        self.assertEqual(5, len(mail.outbox))
+
+
+class MailerLanguageTest(TestCase):
+    def setUp(self):
+        self.user = create_inactive_user()
+        mailer.clear_rendered()
+
+    def test_user_language(self):
+        self.user.language = 'fr'
+        message = ValidateAccountMailer(self.user).build_message()
+        self.assertEqual('Validation de votre adresse email', message.subject)
+        self.assertIn('pour confirmer votre compte : http', message.body)
+        html = message.alternatives[0][0]
+        self.assertIn('<title>Validation de votre adresse email</title>', html)
+        self.assertIn(f'href="http://localhost:8000/account/activation/'
+                      f'{self.user.validation_token}/"', html)
+
+        self.user.language = 'en'
+        message = ValidateAccountMailer(self.user).build_message()
+        self.assertEqual('Email address validation', message.subject)
+        self.assertIn('To confirm your account please copy the following link', message.body)
+
+    def test_default_language(self):
+        with self.settings(LANGUAGE_CODE='fr'), translation.override('en'):
+            message = UpdateEmailMailer(self.user).build_message()
+        self.assertEqual('Confirmation de votre adresse email pour Django Base',
+                         message.subject)
+
+    def test_rendered_once_per_language(self):
+        with mock.patch.object(mailer, 'get_template',
+                               wraps=mailer.get_template) as get_template:
+            for language in ('en', 'fr', 'en', 'fr'):
+                self.user.language = language
+                ValidateAccountMailer(self.user).build_message()
+        self.assertEqual(2, get_template.call_count)
+
+    def test_escaped_values(self):
+        with mock.patch.object(ValidateAccountMailer, 'email_link',
+                               return_value='http://b99.com/?a=1&b=2'):
+            message = ValidateAccountMailer(self.user).build_message()
+        self.assertIn('href="http://b99.com/?a=1&amp;b=2"', message.alternatives[0][0])
+
+
+@skipUnless(BENCHMARK, 'set BENCHMARK=1 to run benchmarks')
+class MailerBenchmark(TestCase):
+    runs = 1000
+
+    def setUp(self):
+        self.user = create_inactive_user()
+
+    def test_build_message(self):
+        for language in ('en', 'fr'):
+            self.user.language = language
+            for cached in (False, True):
+                mailer.clear_rendered()
+                timings = []
+                for _ in range(self.runs):
+                    if not cached:
+                        mailer.clear_rendered()
+                    start = time.perf_counter()
+                    ValidateAccountMailer(self.user).build_message()
+                    timings.append(time.perf_counter() - start)
+                report(f"build_message {language}, {'cached' if cached else 'rendered'} body",
+                       timings)
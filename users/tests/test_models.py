@@ -1,6 +1,17 @@
+import re
+from importlib import import_module
+from unittest import mock
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from users.models import OutboundEmail
 from .test_data import create_inactive_user
 
+UserModel = get_user_model()
+
 
 class UserTest(TestCase):
 
@@ -12,3 +23,100 @@ class UserTest(TestCase):
         inactive_user.validate()
         self.assertIsNone(inactive_user.validation_token)
         self.assertTrue(inactive_user.is_active)
+
+
+class DirtyFieldsTest(TestCase):
+    def setUp(self):
+        self.user = UserModel.objects.get(pk=create_inactive_user().pk)
+
+    def updated_columns(self, save) -> list:
+        with CaptureQueriesContext(connection) as queries:
+            save()
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(1, len(updates))
+        return re.findall(r'"(\w+)" = ', updates[0].split(' WHERE ')[0])
+
+    def test_validate_updates_changed_columns(self):
+        self.assertEqual(['is_active', 'updated_at'], self.updated_columns(self.user.validate))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+    def test_replace_email_updates_changed_columns(self):
+        self.user.next_email = 'jackie_baracuda@b99.com'
+        self.user.save()
+        self.assertEqual(['email', 'next_email', 'updated_at'],
+                         self.updated_columns(self.user.replace_email))
+
+    def test_set_password_updates_password(self):
+        self.user.set_password('nouveau1234')
+        self.assertEqual(['password', 'updated_at'], self.updated_columns(self.user.save))
+
+    def test_unchanged_not_written(self):
+        updated_at = self.user.updated_at
+        with self.assertNumQueries(0):
+            self.user.save()
+        self.user.first_name = self.user.first_name
+        with self.assertNumQueries(0):
+            self.user.save()
+        self.assertEqual(updated_at, self.user.updated_at)
+
+    def test_saved_changes_tracked(self):
+        self.user.first_name = 'Jacob'
+        self.assertEqual(['first_name', 'updated_at'], self.updated_columns(self.user.save))
+        with self.assertNumQueries(0):
+            self.user.save()
+
+    def test_deferred_fields(self):
+        user = UserModel.objects.only('pk', 'username').get(pk=self.user.pk)
+        user.email = 'terry.jeffords@b99.com'
+        self.assertEqual(['email', 'updated_at'], self.updated_columns(user.save))
+        self.assertEqual(user.password, self.user.password)
+        with self.assertNumQueries(0):
+            user.save()
+
+    def test_new_instances_saved_fully(self):
+        user = UserModel(pk=self.user.pk, username='rosa', email='rosa.diaz@b99.com',
+                         created_at=self.user.created_at)
+        self.assertIn('password', self.updated_columns(user.save))
+
+    def test_dated_model(self):
+        email = OutboundEmail.objects.create(subject='Hello', body='Hi', from_email='a@b99.com',
+                                             to='jake.peralta@b99.com')
+        email = OutboundEmail.objects.get(pk=email.pk)
+        email.subject = 'Hello again'
+        self.assertCountEqual(['subject', 'updated_at'], self.updated_columns(email.save))
+        with self.assertNumQueries(0):
+            email.save()
+
+    def test_explicit_update_fields(self):
+        email = OutboundEmail.objects.create(subject='Hello', body='Hi', from_email='a@b99.com',
+                                             to='jake.peralta@b99.com')
+        email.attempts = 1
+        # As with any model, updated_at is written only when listed
+        self.assertEqual(['attempts'],
+                         self.updated_columns(lambda: email.save(update_fields=['attempts'])))
+
+    def test_user_explicit_update_fields(self):
+        # updated_at versions the cached users, see EmailUser.save
+        updated_at = self.user.updated_at
+        self.assertEqual(['last_login', 'updated_at'], self.updated_columns(
+            lambda: update_last_login(None, self.user)))
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.updated_at, updated_at)
+
+
+class EmailUniquenessMigrationTest(TestCase):
+    def test_duplicates_listed(self):
+        migration = import_module('users.migrations.0009_emailuser_email_upper_unique')
+        with connection.cursor() as cursor:
+            # Rolled back with the test
+            cursor.execute('DROP INDEX users_emailuser_email_upper_uniq')
+        first = UserModel.objects.create(username='jake', email='Jake@b99.com')
+        second = UserModel.objects.create(username='peralta', email='jake@B99.com')
+        UserModel.objects.create(username='amy', email='amy@b99.com')
+        schema_editor = mock.Mock(connection=connection)
+        with self.assertRaises(IntegrityError) as raised:
+            migration.check_duplicate_emails(apps, schema_editor)
+        self.assertIn(f'{first.pk}: Jake@b99.com', str(raised.exception))
+        self.assertIn(f'{second.pk}: jake@B99.com', str(raised.exception))
+        self.assertNotIn('amy', str(raised.exception))
@@ -0,0 +1,123 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from users import outbox
+from users.mailer import ValidateAccountMailer
+from users.models import OutboundEmail
+from .test_data import create_user_amy, create_user_jake
+
+UNAVAILABLE_BACKEND = 'users.tests.test_outbox.UnavailableBackend'
+UNREACHABLE_BACKEND = 'users.tests.test_outbox.UnreachableBackend'
+
+
+class UnavailableBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError("SMTP server unavailable")
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError("SMTP server unreachable")
+
+    def send_messages(self, email_messages):
+        raise AssertionError("not connected")
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.user = create_user_jake()
+
+    def test_send_enqueues(self):
+        ValidateAccountMailer(self.user).send()
+        self.assertEqual(0, len(mail.outbox))
+        email = OutboundEmail.objects.get()
+        self.assertEqual(OutboundEmail.PENDING, email.status)
+        self.assertEqual('jake.peralta@b99.com', email.to)
+        self.assertIn('<html', email.html_body)
+
+    @override_settings(EMAIL_QUEUE=False)
+    def test_send_without_queue(self):
+        ValidateAccountMailer(self.user).send()
+        self.assertEqual(1, len(mail.outbox))
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_drain_reuses_connection(self):
+        ValidateAccountMailer(self.user).send()
+        ValidateAccountMailer(create_user_amy()).send()
+        with mock.patch.object(outbox, 'get_connection',
+                               wraps=outbox.get_connection) as get_connection:
+            self.assertEqual({'sent': 2}, outbox.drain())
+        get_connection.assert_called_once()
+        self.assertEqual(2, len(mail.outbox))
+        self.assertEqual('text/html', mail.outbox[0].alternatives[0][1])
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.SENT).exists())
+
+    def test_drain_batch_size(self):
+        ValidateAccountMailer(self.user).send()
+        ValidateAccountMailer(create_user_amy()).send()
+        self.assertEqual({'sent': 1}, outbox.drain(batch_size=1))
+        self.assertEqual({'sent': 1}, outbox.drain(batch_size=1))
+        self.assertEqual({}, outbox.drain(batch_size=1))
+
+    @override_settings(EMAIL_BACKEND=UNAVAILABLE_BACKEND)
+    def test_retry_with_backoff(self):
+        ValidateAccountMailer(self.user).send()
+        self.assertEqual({'retried': 1}, outbox.drain(backoff=60))
+        email = OutboundEmail.objects.get()
+        self.assertEqual(OutboundEmail.PENDING, email.status)
+        self.assertEqual(1, email.attempts)
+        self.assertIn('SMTP server unavailable', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        self.assertEqual({}, outbox.drain())
+
+    @override_settings(EMAIL_BACKEND=UNAVAILABLE_BACKEND)
+    def test_dead_letter(self):
+        ValidateAccountMailer(self.user).send()
+        for _ in range(3):
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            outbox.drain(max_attempts=3)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(OutboundEmail.DEAD, email.status)
+        self.assertEqual(3, email.attempts)
+
+    def test_command(self):
+        ValidateAccountMailer(self.user).send()
+        call_command('send_queued_emails', stdout=mock.Mock())
+        self.assertEqual(1, len(mail.outbox))
+
+    @override_settings(EMAIL_BACKEND=UNREACHABLE_BACKEND)
+    def test_connection_failure(self):
+        ValidateAccountMailer(self.user).send()
+        ValidateAccountMailer(create_user_amy()).send()
+        self.assertEqual({'retried': 2}, outbox.drain(backoff=60))
+        for email in OutboundEmail.objects.all():
+            self.assertEqual(OutboundEmail.PENDING, email.status)
+            self.assertEqual(1, email.attempts)
+            self.assertIn('SMTP server unreachable', email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual({'dead': 2}, outbox.drain(max_attempts=2))
+
+    @override_settings(EMAIL_BACKEND=UNREACHABLE_BACKEND)
+    def test_command_connection_failure(self):
+        ValidateAccountMailer(self.user).send()
+        stdout = StringIO()
+        call_command('send_queued_emails', stdout=stdout)
+        self.assertIn('1 retried', stdout.getvalue())
+
+    @override_settings(EMAIL_QUEUE_LEASE=600)
+    def test_batch_claimed(self):
+        ValidateAccountMailer(self.user).send()
+        with mock.patch.object(outbox, 'get_connection', side_effect=KeyboardInterrupt), \
+                self.assertRaises(KeyboardInterrupt):
+            outbox.drain()
+        # Worker killed while sending: sent again once the lease expires
+        email = OutboundEmail.objects.get()
+        self.assertEqual(0, email.attempts)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=500))
+        self.assertEqual({}, outbox.drain())
@@ -0,0 +1,202 @@
+"""
+Query count, time and memory regression checks for the user views.
+
+Run with: ./manage.py test users.tests.test_performance
+Each scenario is compared to performance_baseline.json and fails when it
+runs more queries than the baseline. With BENCHMARK=1 it also fails when it
+is slower or allocates more than PERFORMANCE_TOLERANCE times the baseline
+(plus a few milliseconds for the time), timings being too noisy on shared
+CI runners to be checked on every run. Times are scaled by a CPU
+calibration loop so that the baseline can be recorded on another machine.
+Record a new baseline with: UPDATE_PERFORMANCE_BASELINE=1 ./manage.py test ...
+"""
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Optional
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.shortcuts import reverse
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django_base.test_helpers import BENCHMARK
+from .test_data import create_inactive_user, create_user_amy, create_user_jake
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'performance_baseline.json')
+UPDATE_BASELINE = os.environ.get('UPDATE_PERFORMANCE_BASELINE')
+TOLERANCE = float(os.environ.get('PERFORMANCE_TOLERANCE', 2))
+# Absolute slack absorbing the noise on views taking a few milliseconds
+TIME_SLACK = 0.005
+# Absolute slack absorbing interpreter-wide table resizes, e.g. the weakref.finalize
+# registry grown by the signal receivers the test client connects on every request
+ALLOCATION_SLACK = 64 * 1024
+RUNS = 10
+
+
+def calibrate() -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        sorted(str(i * i) for i in range(100_000))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+class ViewPerformanceTest(TestCase):
+    results: dict = {}
+    baseline: dict = {}
+    calibration = 1.0
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.calibration = calibrate()
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH, encoding='utf-8') as file:
+                cls.baseline = json.load(file)
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE_BASELINE:
+            with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+                json.dump({'calibration': cls.calibration,
+                           'views': dict(sorted(cls.results.items()))},
+                          file, indent=2)
+                file.write('\n')
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = create_user_jake()
+        create_user_amy()
+
+    def measure(self, name: str, request: Callable[[Client], HttpResponse],
+                prepare: Optional[Callable[[Client], None]] = None,
+                authenticated: bool = False, status_code: int = 200) -> None:
+        timings = []
+        query_count = allocated = 0
+        # The first run warms up templates and lazy imports
+        for run in range(RUNS + 2):
+            with transaction.atomic():
+                client = Client()
+                if authenticated:
+                    client.force_login(self.user)
+                if prepare:
+                    prepare(client)
+                if run == 0:
+                    request(client)
+                elif run == 1:
+                    tracemalloc.start()
+                    with CaptureQueriesContext(connection) as queries:
+                        response = request(client)
+                    allocated = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    # The query log is cleared when the next request starts
+                    query_count = len(queries)
+                    self.assertEqual(status_code, response.status_code, name)
+                else:
+                    start = time.perf_counter()
+                    request(client)
+                    timings.append(time.perf_counter() - start)
+                transaction.set_rollback(True)
+        self.check(name, {'queries': query_count, 'time': statistics.median(timings),
+                          'allocated': allocated})
+
+    def check(self, name: str, result: dict) -> None:
+        self.results[name] = result
+        expected = self.baseline.get('views', {}).get(name)
+        if UPDATE_BASELINE or not expected:
+            return
+        with self.subTest(name):
+            self.assertLessEqual(result['queries'], expected['queries'],
+                                 f"{name} runs more queries than the baseline")
+            if not BENCHMARK:
+                return
+            scale = self.calibration / self.baseline['calibration']
+            self.assertLessEqual(result['time'],
+                                 expected['time'] * scale * TOLERANCE + TIME_SLACK,
+                                 f"{name} is slower than the baseline")
+            self.assertLessEqual(result['allocated'],
+                                 expected['allocated'] * TOLERANCE + ALLOCATION_SLACK,
+                                 f"{name} allocates more memory than the baseline")
+
+    def test_login(self):
+        url = reverse('login')
+        self.measure('login GET', lambda client: client.get(url))
+        self.measure('login POST', lambda client: client.post(
+            url, {'username': 'baracuda', 'password': 'rosa1234'}), status_code=302)
+
+    def test_register(self):
+        url = reverse('register')
+        self.measure('register GET', lambda client: client.get(url))
+        self.measure('register POST', lambda client: client.post(url, {
+            'email': 'rosa.diaz@b99.com', 'username': 'Rosa',
+            'password1': 'badass101', 'password2': 'badass101',
+        }), status_code=302)
+
+    def test_profile(self):
+        url = reverse('profile')
+        self.measure('profile GET', lambda client: client.get(url), authenticated=True)
+
+    def test_edit_profile(self):
+        url = reverse('edit_profile')
+        self.measure('edit_profile GET', lambda client: client.get(url),
+                     authenticated=True)
+        self.measure('edit_profile POST', lambda client: client.post(
+            url, {'username': 'jajake', 'first_name': 'Jake', 'last_name': 'Peralta'}
+        ), authenticated=True, status_code=302)
+
+    def test_update_email(self):
+        url = reverse('update_email')
+        self.measure('update_email GET', lambda client: client.get(url),
+                     authenticated=True)
+        self.measure('update_email POST', lambda client: client.post(
+            url, {'next_email': 'jackie_baracuda@b99.com'}
+        ), authenticated=True, status_code=302)
+
+    def test_validate_email(self):
+        url = reverse('validate_email', kwargs={
+            'validation_token': create_inactive_user().validation_token
+        })
+        self.measure('validate_email GET', lambda client: client.get(url))
+
+    def test_validate_new_email(self):
+        self.user.next_email = 'jackie_baracuda@b99.com'
+        self.user.save()
+        url = reverse('validate_new_email', kwargs={
+            'validation_token': self.user.new_email_validation_token()
+        })
+        self.measure('validate_new_email GET', lambda client: client.get(url),
+                     authenticated=True, status_code=302)
+
+    def test_change_password(self):
+        url = reverse('change_password')
+        self.measure('change_password POST', lambda client: client.post(url, {
+            'old_password': 'rosa1234', 'new_password1': 'nouveau1234',
+            'new_password2': 'nouveau1234',
+        }), authenticated=True, status_code=302)
+
+    def test_password_reset(self):
+        url = reverse('reset_password')
+        self.measure('reset_password GET', lambda client: client.get(url))
+        self.measure('reset_password POST', lambda client: client.post(
+            url, {'email': 'jake.peralta@b99.com'}), status_code=302)
+
+        confirm_url = reverse('password_reset_confirm', kwargs={
+            'uidb64': urlsafe_base64_encode(force_bytes(self.user.pk)),
+            'token': default_token_generator.make_token(self.user),
+        })
+        set_password_url = reverse('password_reset_confirm', kwargs={
+            'uidb64': urlsafe_base64_encode(force_bytes(self.user.pk)),
+            'token': 'set-password',
+        })
+        self.measure('password_reset_confirm GET',
+                     lambda client: client.get(confirm_url), status_code=302)
+        self.measure('password_reset_confirm POST', lambda client: client.post(
+            set_password_url, {'new_password1': 'nouveau1234',
+                               'new_password2': 'nouveau1234'}
+        ), prepare=lambda client: client.get(confirm_url), status_code=302)
@@ -0,0 +1,103 @@
+from unittest import mock
+from django.contrib.auth import authenticate
+from django.core.cache import caches
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django_base.test_helpers import LOCMEM_CACHES
+from users import throttle
+from .test_data import create_user_jake
+
+RATES = {'ip': (5, 60), 'identifier': (3, 60)}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, LOGIN_THROTTLE_RATES=RATES)
+class LoginThrottleTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        throttle.local_cache.clear()
+        throttle.throttle_stats.clear()
+        self.user = create_user_jake()
+
+    def login(self, username: str, password: str = 'wrong', ip: str = '10.0.0.1'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password},
+                                REMOTE_ADDR=ip)
+
+    def test_identifier_limit(self):
+        for _ in range(3):
+            self.assertEqual(200, self.login('baracuda').status_code)
+        # Normalized like the login lookup
+        response = self.login('BARACUDA ', ip='10.0.0.2')
+        self.assertEqual(429, response.status_code)
+        self.assertContains(response, 'Too many login attempts', status_code=429)
+        self.assertEqual({'rejected_identifier': 1}, throttle.throttle_stats)
+        self.assertEqual(200, self.login('Aby', ip='10.0.0.2').status_code)
+
+    def test_ip_limit(self):
+        for index in range(5):
+            self.login(f"user{index}")
+        self.assertEqual(429, self.login('user5').status_code)
+        self.assertEqual(200, self.login('user5', ip='10.0.0.2').status_code)
+        self.assertEqual({'rejected_ip': 1}, throttle.throttle_stats)
+
+    def test_rejected_before_query_and_hash(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        for _ in range(3):
+            authenticate(request, username='nobody', password='wrong')
+        with CaptureQueriesContext(connection) as queries, \
+                mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.verify') as verify:
+            self.assertIsNone(authenticate(request, username='nobody', password='wrong'))
+        self.assertEqual(0, len(queries))
+        verify.assert_not_called()
+        self.assertTrue(request.login_throttled)
+
+    def test_window_slides(self):
+        # 40 seconds into the window [960, 1020)
+        with mock.patch('users.throttle.time.time', return_value=1000):
+            for _ in range(3):
+                self.login('baracuda')
+            self.assertEqual(429, self.login('baracuda').status_code)
+        # The previous window still counts in full
+        with mock.patch('users.throttle.time.time', return_value=1020):
+            self.assertEqual(429, self.login('baracuda').status_code)
+        # Two thirds of it left: 2 attempts
+        with mock.patch('users.throttle.time.time', return_value=1040):
+            response = self.login('baracuda', 'rosa1234')
+        self.assertEqual(302, response.status_code)
+
+    @override_settings(LOGIN_THROTTLE_ALIAS=None)
+    def test_local_counters(self):
+        with mock.patch('users.throttle.time.time', return_value=1000):
+            for _ in range(3):
+                self.login('baracuda')
+            self.assertEqual(429, self.login('baracuda').status_code)
+            key = f"{throttle.identifier_windows.key('BARACUDA')}:16"
+            self.assertEqual(3, throttle.local_cache.get(key))
+            self.assertIsNone(caches['default'].get(key))
+
+    def test_cache_unavailable(self):
+        with mock.patch.object(caches['default'], 'add', side_effect=ConnectionError), \
+                self.assertLogs('users.throttle', 'ERROR'):
+            for _ in range(3):
+                self.login('baracuda')
+            self.assertEqual(429, self.login('baracuda').status_code)
+
+
+class ClientIPTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_remote_addr(self):
+        request = self.factory.get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='10.0.0.2')
+        self.assertEqual('10.0.0.1', throttle.client_ip(request))
+
+    @override_settings(TRUSTED_PROXY_COUNT=2)
+    def test_trusted_proxies(self):
+        # The first address is set by the client
+        request = self.factory.get('/', REMOTE_ADDR='10.0.0.1',
+                                   HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7, 10.0.0.2')
+        self.assertEqual('203.0.113.7', throttle.client_ip(request))
+        # Not forwarded by every proxy
+        request = self.factory.get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='10.0.0.2')
+        self.assertEqual('10.0.0.1', throttle.client_ip(request))
@@ -1,9 +1,14 @@
+from datetime import timedelta
+from unittest import mock
 from django.core import mail
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.http import HttpResponse
 from django.shortcuts import reverse
 from django_base.test_helpers import TestHelpers
+from users.outbox import drain
 from .test_data import create_user_amy, create_user_jake, create_inactive_user
 
 UserModel = get_user_model()
@@ -102,11 +107,26 @@ class RegisterTest(TestCase, TestHelpers):
         self.assertIn('It must contain at least 8 characters.',
                       response.context['form'].errors['password2'][0])
 
+    def test_concurrent_registration(self):
+        # Same email, registered by another request after the form was cleaned
+        with mock.patch.object(UserModel, 'email_taken', side_effect=[False, True]):
+            response = self.client.post(self.url, {
+                'email': 'JAKE.PERALTA@b99.com', 'username': 'Rosa',
+                'password1': 'badass101', 'password2': 'badass101'})
+        self.assertEqual(200, response.status_code)
+        self.assertIn('A user with that email already exists',
+                      response.context['form'].errors['email'][0])
+        self.assertFalse(UserModel.objects.filter(username='Rosa').exists())
+
     def test_user_inactive_after_registration(self):
         self.register_valid_user()
         user = UserModel.objects.get(email='rosa.diaz@b99.com')
         self.assertFalse(user.is_active)
 
+    def test_registration_language(self):
+        self.register_valid_user()
+        self.assertEqual('en', UserModel.objects.get(email='rosa.diaz@b99.com').language)
+
     def test_generate_auth_token(self):
         self.register_valid_user()
         user = UserModel.objects.get(email='rosa.diaz@b99.com')
@@ -114,6 +134,7 @@ class RegisterTest(TestCase, TestHelpers):
 
     def test_confirmation_email_sent(self):
         self.register_valid_user()
+        drain()
         user = UserModel.objects.get(email='rosa.diaz@b99.com')
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn(user.validation_token, mail.outbox[0].body)
@@ -131,6 +152,60 @@ class RegisterTest(TestCase, TestHelpers):
         expected = "Thank you! Your account is now active."
         self.assert_content(response, expected)
 
+    def test_registration_single_user_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.register_valid_user()
+        user_writes = [q['sql'] for q in queries
+                       if 'users_emailuser' in q['sql'] and not q['sql'].startswith('SELECT')]
+        self.assertEqual(1, len(user_writes))
+        self.assertTrue(user_writes[0].startswith('INSERT'))
+
+    def test_user_confirmation_single_query(self):
+        user = create_inactive_user()
+        url = reverse('validate_email',
+                      kwargs={'validation_token': user.validation_token})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assert_content(response, "Thank you! Your account is now active.")
+        self.assertEqual(1, len(queries))
+        self.assertTrue(queries[0]['sql'].startswith('UPDATE'))
+
+    def test_user_confirmation_link_followed_twice(self):
+        user = create_inactive_user()
+        url = reverse('validate_email',
+                      kwargs={'validation_token': user.validation_token})
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assert_content(response, "Thank you! Your account is now active.")
+
+    def test_user_confirmation_failure_email_changed(self):
+        user = create_inactive_user()
+        url = reverse('validate_email',
+                      kwargs={'validation_token': user.validation_token})
+        self.client.get(url)
+        user.refresh_from_db()
+        user.email = 'jake@b99.com'
+        user.save()
+        response = self.client.get(url)
+        self.assert_content(response, "Invalid activation link")
+
+    def test_user_confirmation_failure_expired_token(self):
+        user = create_inactive_user()
+        token = user.generate_validation_token(
+            issued_at=user.created_at - timedelta(days=8))
+        response = self.client.get(reverse('validate_email',
+                                           kwargs={'validation_token': token}))
+        self.assert_content(response, "Invalid activation link")
+        user.refresh_from_db()
+        self.assertFalse(user.is_active)
+
+    def test_user_confirmation_failure_email_change_token(self):
+        user = create_inactive_user()
+        url = reverse('validate_email',
+                      kwargs={'validation_token': user.new_email_validation_token()})
+        response = self.client.get(url)
+        self.assert_content(response, "Invalid activation link")
+
     def test_user_confirmation_failure_invalid_token(self):
         active_before = UserModel.objects.filter(is_active=True).count()
         url = 'http://localhost:8000/account/activation/1234/'
@@ -246,6 +321,7 @@ class UpdateEmailTest(TestCase, TestHelpers):
     def test_require_update(self):
         data = {'next_email': 'jackie_baracuda@b99.com'}
         response = self.client.post(reverse('update_email'), data, follow=True)
+        drain()
         self.user.refresh_from_db()
         self.assertEqual('jackie_baracuda@b99.com', self.user.next_email)
         self.assertEqual(len(mail.outbox), 1)
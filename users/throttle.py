@@ -0,0 +1,109 @@
+"""
+Sliding window counters limiting the login attempts per client IP and per
+identifier.
+
+At most `attempts` are allowed per `seconds`: the attempts of the current
+window are added to those of the previous one, weighted by the part of it
+still within the last `seconds`. Counters are updated with the atomic
+add() and incr() of LOGIN_THROTTLE_ALIAS, shared by every process, or of
+the process memory when it is None or unavailable.
+"""
+import hashlib
+import logging
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django_base.profiling import count
+
+logger = logging.getLogger(__name__)
+
+local_cache = LocMemCache('users-throttle', {'OPTIONS': {'MAX_ENTRIES': 10_000}})
+throttle_stats: Counter = Counter()
+
+
+class SlidingWindow:
+    key_prefix = 'users:throttle'
+
+    def __init__(self, scope: str):
+        self.scope = scope
+
+    def take(self, value: str) -> bool:
+        """Count one attempt, False when the limit is reached."""
+        key = self.key(value)
+        try:
+            return self.hit(shared_cache(), key)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Login throttle cache unavailable")
+            return self.hit(local_cache, key)
+
+    def hit(self, cache, key: str) -> bool:
+        attempts, seconds = settings.LOGIN_THROTTLE_RATES[self.scope]
+        window, elapsed = divmod(time.time(), seconds)
+        current = f"{key}:{int(window)}"
+        # Kept for the next window, where it is the previous one
+        cache.add(current, 0, 2 * seconds)
+        try:
+            taken = cache.incr(current)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.set(current, 1, 2 * seconds)
+            taken = 1
+        previous = cache.get(f"{key}:{int(window) - 1}", 0)
+        if previous * (1 - elapsed / seconds) + taken <= attempts:
+            return True
+        # Rejected attempts don't count, the client gets in as the window slides
+        cache.decr(current)
+        return False
+
+    def key(self, value: str) -> str:
+        # Hashed, as identifiers can hold characters cache keys can't
+        digest = hashlib.md5(value.encode()).hexdigest()
+        return f"{self.key_prefix}:{self.scope}:{digest}"
+
+
+def shared_cache():
+    alias = settings.LOGIN_THROTTLE_ALIAS
+    return caches[alias] if alias else local_cache
+
+
+def normalize_identifier(identifier: str) -> str:
+    # Logins are case insensitive, see users.backends.login_queryset
+    return identifier.strip().upper()
+
+
+def client_ip(request) -> str:
+    """Address the first of the TRUSTED_PROXY_COUNT proxies got the request from."""
+    proxies = settings.TRUSTED_PROXY_COUNT
+    if proxies:
+        # Each proxy appends the address it got the request from, the
+        # addresses before those are set by the client
+        forwarded = [address.strip() for address
+                     in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+                     if address.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR') or ''
+
+
+ip_windows = SlidingWindow('ip')
+identifier_windows = SlidingWindow('identifier')
+
+
+def login_allowed(request, identifier: str) -> bool:
+    """
+    Count an attempt in both the IP and identifier windows. The request is
+    flagged so the login form can tell the user to come back later.
+    """
+    if request is not None and not ip_windows.take(client_ip(request)):
+        rejected = 'rejected_ip'
+    elif not identifier_windows.take(normalize_identifier(identifier)):
+        rejected = 'rejected_identifier'
+    else:
+        return True
+    throttle_stats[rejected] += 1
+    count(f"throttle.{rejected}")
+    if request is not None:
+        request.login_throttled = True
+    return False
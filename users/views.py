@@ -1,36 +1,82 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
 from django.contrib.auth import views as auth_views
-from django.contrib.auth import get_user_model
+from django.contrib.auth import REDIRECT_FIELD_NAME, get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpResponseRedirect
+from django.template.response import TemplateResponse
 from django.views import generic
 from django.urls import reverse_lazy
 from django.shortcuts import reverse, render, redirect
-from .auth_token import user_from_token
+from django_base.async_views import (
+    AsyncDeferredMailMixin, AsyncLoginRequiredMixin, AsyncView, AsyncViewMixin, DeferredMailMixin,
+)
+from django_base.page_cache import AnonymousPageCacheMixin
+from .auth_token import activate_from_token, user_from_token
 from .forms import LoginForm, RegisterForm, UpdateEmailForm
+from .mailer import UpdateEmailMailer, ValidateAccountMailer
 UserModel = get_user_model()
 
 
-class LoginView(auth_views.LoginView):
+class LoginView(AnonymousPageCacheMixin, auth_views.LoginView):
     form_class = LoginForm
+    page_cache_query = (REDIRECT_FIELD_NAME,)
     template_name = 'users/login.html'
 
+    def form_invalid(self, form):
+        response = super().form_invalid(form)
+        if getattr(self.request, 'login_throttled', False):
+            response.status_code = 429
+        return response
 
-class RegisterView(generic.CreateView):
+
+class BaseRegisterView(AnonymousPageCacheMixin, generic.CreateView):
     form_class = RegisterForm
+    # Sent by DeferredMailMixin or AsyncDeferredMailMixin
+    mailer = None
     template_name = 'users/register.html'
     success_url = reverse_lazy('login')
 
+    def form_valid(self, form):
+        # Queued emails are inserted in the user's transaction, sent ones
+        # wait for the response
+        queued = settings.EMAIL_QUEUE
+        try:
+            self.object = form.save(send_email=queued)
+        except IntegrityError:
+            return self.form_invalid(form)
+        if not queued:
+            self.mailer = ValidateAccountMailer(self.object)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class RegisterView(DeferredMailMixin, BaseRegisterView):
+    pass
+
+
+class AsyncRegisterView(AsyncViewMixin, AsyncDeferredMailMixin, BaseRegisterView):
+    pass
+
 
 class EmailValidationView(generic.View):
     def get(self, request, validation_token):   # pylint: disable=R0201
-        if user := user_from_token(validation_token):
-            user.validate()
-            return render(request, 'users/email_confirmed.html', {'user': user})
+        if activate_from_token(validation_token):
+            return render(request, 'users/email_confirmed.html')
         return render(request, 'users/confirmation_failure.html')
 
 
+class AsyncEmailValidationView(AsyncView):
+    async def get(self, request, validation_token):   # pylint: disable=R0201
+        # Rendered by the handler, in the sync thread
+        if await sync_to_async(activate_from_token)(validation_token):
+            return TemplateResponse(request, 'users/email_confirmed.html')
+        return TemplateResponse(request, 'users/confirmation_failure.html')
+
+
 class ProfileView(LoginRequiredMixin, generic.DetailView):
     template_name = 'users/profile.html'
     context_object_name = 'user'
@@ -39,6 +85,15 @@ class ProfileView(LoginRequiredMixin, generic.DetailView):
         return self.request.user
 
 
+class AsyncProfileView(AsyncLoginRequiredMixin, generic.base.TemplateResponseMixin, AsyncView):
+    template_name = 'users/profile.html'
+
+    async def get(self, request):
+        # request.user was loaded by AsyncLoginRequiredMixin, the template is
+        # rendered by the handler
+        return self.render_to_response({'user': request.user, 'view': self})
+
+
 class UpdateProfileView(LoginRequiredMixin, generic.UpdateView):
     model = UserModel
     fields = ['username', 'first_name', 'last_name']
@@ -52,8 +107,10 @@ class UpdateProfileView(LoginRequiredMixin, generic.UpdateView):
         return reverse('profile')
 
 
-class UpdateEmailView(LoginRequiredMixin, generic.UpdateView):
+class BaseUpdateEmailView(generic.UpdateView):
     form_class = UpdateEmailForm
+    # Sent by DeferredMailMixin or AsyncDeferredMailMixin
+    mailer = None
     template_name = 'users/edit_email.html'
 
     def get_object(self, queryset=None):
@@ -63,7 +120,7 @@ class UpdateEmailView(LoginRequiredMixin, generic.UpdateView):
         return reverse('profile')
 
     def form_valid(self, form):
-        form.save()
+        self.mailer = UpdateEmailMailer(form.save(send_email=False))
         self.success_messages()
         return redirect(reverse('profile'))
 
@@ -74,7 +131,17 @@ class UpdateEmailView(LoginRequiredMixin, generic.UpdateView):
             _('Please check your mailbox to confirm your new email'))
 
 
+class UpdateEmailView(LoginRequiredMixin, DeferredMailMixin, BaseUpdateEmailView):
+    pass
+
+
+class AsyncUpdateEmailView(AsyncViewMixin, AsyncLoginRequiredMixin, AsyncDeferredMailMixin,
+                           BaseUpdateEmailView):
+    pass
+
+
 class NewEmailValidationView(generic.View):
+    # Database work only: run in the sync thread by the ASGI handler too
     def get(self, request, validation_token):  # pylint: disable=R0201
         if user := user_from_token(validation_token):
             try:
@@ -115,7 +182,7 @@ class ChangePasswordView(LoginRequiredMixin, auth_views.PasswordChangeView):
             _('Your password has been modified'))
 
 
-class ResetPasswordView(auth_views.PasswordResetView):
+class ResetPasswordView(AnonymousPageCacheMixin, auth_views.PasswordResetView):
     template_name = 'users/password_reset_form.html'
     success_url = reverse_lazy('login')
 
@@ -4,17 +4,22 @@ module.exports = {
   entry: './assets/index.js',  // path to our input file
   output: {
     filename: 'index-bundle.js',  // output bundle file name
+    // Styles are extracted to their own file, linked in the <head> so pages
+    // render styled before the script runs
+    cssFilename: 'index-bundle.css',
     path: path.resolve(__dirname, './static'),  // path to our Django static directory
+    // Names get their content hash from Django's collectstatic (ManifestStaticFilesStorage)
+  },
+  experiments: {
+    // Native CSS support, emitting the styles as a CSS file
+    css: true,
   },
   module: {
     rules: [
       {
         test: /\.s[ac]ss$/i,
+        type: "css",
         use: [
-          // Creates `style` nodes from JS strings
-          "style-loader",
-          // Translates CSS into CommonJS
-          "css-loader",
           // Compiles Sass to CSS
           "sass-loader",
         ],
@@ -22,4 +27,3 @@ module.exports = {
     ],
   },
 };
-  